@@ -0,0 +1,310 @@
+"""
+Offline benchmark of document extraction, each agent and the compiled workflow.
+
+LLM calls are answered by the replay model from fixtures/llm_responses.json and Hunter.io
+lookups by the replay transport from fixtures/hunter_responses.json, each with a configurable
+synthetic latency, so runs are repeatable and never touch the network.
+
+    python -m benchmarks.run -n 50 -c 8 -o bench.json
+    python -m benchmarks.run -n 50 -c 8 --compare bench.json   # exits 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SCENARIOS = ["extract", "ats_analysis", "cold_mail_writer", "email_finder", "graph", "graph_fused"]
+LINES_PER_PAGE = 45
+COMPANIES = ["Acme Analytics", "Northwind Labs", "Globex"]
+# RSS is sampled this often while a scenario runs
+RSS_SAMPLE_SECONDS = 0.01
+# Growth below this is allocator noise and never counts as a memory regression
+RSS_NOISE_MB = 5.0
+
+
+def configure_offline(cache_dir: Path, llm_latency: float, hunter_latency: float) -> None:
+    """
+    Points the app at the replay LLM, the replay Hunter.io transport and a fresh cache.
+    Must run before any other `src` module is imported, since they read their settings on import.
+    """
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_REPLAY_PATH"] = str(FIXTURES / "llm_responses.json")
+    os.environ["LLM_REPLAY_LATENCY"] = str(llm_latency)
+    os.environ["HUNTER_API_KEY"] = os.getenv("HUNTER_API_KEY") or "replay"
+    os.environ["CACHE_PATH"] = str(cache_dir / "cache.sqlite")
+    # measure the code, not the provider quotas
+    os.environ.setdefault("RATE_LIMIT_HUNTER", "10000:10000")
+
+    from src.replay import HunterReplayTransport
+    from src.utils import set_http_transport
+
+    set_http_transport(HunterReplayTransport.from_file(FIXTURES / "hunter_responses.json", hunter_latency))
+
+
+def resume_lines(pages: int, seed: int) -> List[str]:
+    from src.scorer import SKILL_VOCABULARY
+
+    rng = random.Random(seed)
+    lines = [f"Candidate {seed}", "Senior Software Engineer | candidate@example.com | +1 555 0100", "", "EXPERIENCE"]
+    while len(lines) < pages * LINES_PER_PAGE:
+        skills = ", ".join(rng.sample(SKILL_VOCABULARY, 4))
+        lines.append(f"- Built and operated services using {skills}; improved latency by {rng.randint(5, 60)}%.")
+    return lines[:pages * LINES_PER_PAGE]
+
+
+def synthesize_pdf(pages: int, seed: int) -> bytes:
+    import fitz  # PyMuPDF
+
+    lines = resume_lines(pages, seed)
+    with fitz.open() as doc:
+        for start in range(0, len(lines), LINES_PER_PAGE):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 570, 800), "\n".join(lines[start:start + LINES_PER_PAGE]), fontsize=9)
+        return doc.tobytes()
+
+
+def synthesize_docx(pages: int, seed: int) -> bytes:
+    import io
+    import docx
+
+    document = docx.Document()
+    for line in resume_lines(pages, seed):
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def job_description(index: int) -> str:
+    from src.scorer import SKILL_VOCABULARY
+
+    rng = random.Random(10_000 + index)
+    company = COMPANIES[index % len(COMPANIES)]
+    return (
+        f"{company} is hiring a Senior Software Engineer (requisition {index}).\n"
+        f"Requirements: {', '.join(rng.sample(SKILL_VOCABULARY, 8))}.\n"
+        "You will design, build and run data-intensive services with a small product team."
+    )
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class RSSSampler:
+    """
+    Samples the process RSS in a background thread while a scenario runs, so each scenario
+    reports its own peak instead of the process-lifetime `ru_maxrss`.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        from src.telemetry import current_rss_mb
+
+        self._rss = current_rss_mb
+        self.interval = interval
+        self.before = self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss())
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+def run_scenario(name: str, fn: Callable[[Any], Any], inputs: Sequence[Any], concurrency: int) -> Dict[str, Any]:
+    """
+    Runs `fn` over `inputs` with `concurrency` threads and reports latency percentiles, throughput,
+    the peak RSS while the scenario ran and how far it grew above the RSS the scenario started at.
+    The first input only warms up lazy imports and clients and is not timed or measured. A result
+    dict carrying an "error" counts as a failure.
+    """
+    from src.batch import percentile
+
+    warmup, inputs = inputs[0], inputs[1:]
+    try:
+        fn(warmup)
+    except Exception:
+        pass
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            result = fn(item)
+            ok = not (isinstance(result, dict) and result.get("error"))
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, inputs))
+        elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    return {
+        "name": name,
+        "operations": len(results),
+        "concurrency": concurrency,
+        "errors": sum(not ok for _, ok in results),
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 50), 4),
+        "latency_p95_seconds": round(percentile(latencies, 95), 4),
+        "latency_p99_seconds": round(percentile(latencies, 99), 4),
+        "peak_rss_mb": rss.peak,
+        "rss_growth_mb": round(rss.peak - rss.before, 1),
+    }
+
+
+def run_benchmarks(scenarios: Sequence[str], iterations: int, concurrency: int, work_dir: Path,
+                   pdf_pages: Sequence[int] = (1, 5, 20), docx_pages: Sequence[int] = (1, 5)) -> List[Dict[str, Any]]:
+    from src.utils import extract_from_doc
+    from src.workflow import get_graph
+    from src.agents import ats_analysis_agent, cold_mail_writer_agent, email_finder_agent
+
+    reports = []
+    count = iterations + 1  # plus the warm-up input of each scenario
+    if "extract" in scenarios:
+        # every file is distinct, so each extraction misses the parsed-document store
+        for suffix, page_counts, synthesize in ((".pdf", pdf_pages, synthesize_pdf), (".docx", docx_pages, synthesize_docx)):
+            for pages in page_counts:
+                paths = []
+                for index in range(count):
+                    path = work_dir / f"resume_{pages}p_{index}{suffix}"
+                    path.write_bytes(synthesize(pages, seed=pages * 100_000 + index))
+                    paths.append(path)
+                reports.append(run_scenario(f"extract{suffix.replace('.', '_')}_{pages}p", extract_from_doc, paths, concurrency))
+
+    resume_bytes = synthesize_pdf(2, seed=1)
+    resume_content = extract_from_doc(_write(work_dir / "resume.pdf", resume_bytes))
+    states = [
+        {"job_description": job_description(index), "resume_bytes": resume_bytes, "resume_name": "resume.pdf"}
+        for index in range(count)
+    ]
+
+    if "ats_analysis" in scenarios:
+        reports.append(run_scenario("ats_analysis", ats_analysis_agent, states, concurrency))
+    if "cold_mail_writer" in scenarios:
+        inputs = [{**state, "resume_content": resume_content} for state in states]
+        reports.append(run_scenario("cold_mail_writer", cold_mail_writer_agent, inputs, concurrency))
+    if "email_finder" in scenarios:
+        inputs = [{"ats_analysis_agent": {"company_name": f"Company {index}"}} for index in range(count)]
+        reports.append(run_scenario("email_finder", email_finder_agent, inputs, concurrency))
+    # the graphs get fresh job descriptions so the ATS cache filled above is not reused
+    if "graph" in scenarios:
+        graph = get_graph(fused=False)
+        inputs = [{**state, "job_description": state["job_description"] + "\nTrack: default"} for state in states]
+        reports.append(run_scenario("graph", graph.invoke, inputs, concurrency))
+    if "graph_fused" in scenarios:
+        graph = get_graph(fused=True)
+        inputs = [{**state, "job_description": state["job_description"] + "\nTrack: fused"} for state in states]
+        reports.append(run_scenario("graph_fused", graph.invoke, inputs, concurrency))
+    return reports
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Lists scenarios whose p95 latency grew, whose throughput dropped or whose RSS growth rose
+    by more than `tolerance` (and by more than RSS_NOISE_MB).
+    """
+    previous = {report["name"]: report for report in baseline.get("scenarios", [])}
+    regressions = []
+    for report in current["scenarios"]:
+        before = previous.get(report["name"])
+        if before is None:
+            continue
+        if report["latency_p95_seconds"] > before["latency_p95_seconds"] * (1 + tolerance):
+            regressions.append(f"{report['name']}: p95 {before['latency_p95_seconds']}s -> {report['latency_p95_seconds']}s")
+        if report["throughput_per_second"] < before["throughput_per_second"] * (1 - tolerance):
+            regressions.append(f"{report['name']}: throughput {before['throughput_per_second']}/s -> {report['throughput_per_second']}/s")
+        # baselines recorded before per-scenario memory was measured have no growth to compare
+        growth, growth_before = report["rss_growth_mb"], before.get("rss_growth_mb")
+        if growth_before is not None and growth > max(growth_before * (1 + tolerance), growth_before + RSS_NOISE_MB):
+            regressions.append(f"{report['name']}: RSS growth {growth_before}MB -> {growth}MB")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark of extraction, the agents and the workflow.")
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="Operations per scenario.")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", nargs="*", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Synthetic seconds per LLM call.")
+    parser.add_argument("--hunter-latency", type=float, default=0.1, help="Synthetic seconds per Hunter.io call.")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Also write the report to this file.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline report; exit 1 on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="assistant-bench-") as tmp:
+        work_dir = Path(tmp)
+        configure_offline(work_dir, args.llm_latency, args.hunter_latency)
+        started = time.perf_counter()
+        scenarios = run_benchmarks(args.scenarios, args.iterations, args.concurrency, work_dir)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "llm_latency_seconds": args.llm_latency,
+            "hunter_latency_seconds": args.hunter_latency,
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "scenarios": scenarios,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        for key in ("iterations", "concurrency", "llm_latency_seconds", "hunter_latency_seconds"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"WARNING baseline was run with a different {key}", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
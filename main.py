@@ -1,13 +1,68 @@
-import streamlit as st
-import pandas as pd
-import tempfile
 import os
-from pathlib import Path
-from src.workflow import AgentState, graph
+import json
+import logging
+import streamlit as st
+from src.workflow import AgentState, AGENT_OUTPUT_KEYS, get_graph, resume_point, run_config, regenerate_cold_email, delete_run
 from src.utils import launch_email_client,send_email_smtp
 
 st.set_page_config(page_title="Job Application Assistant", layout="wide")
 
+# When set, analyses are queued on the HTTP API (src/service.py) instead of running in this process
+ASSISTANT_API_URL = os.getenv("ASSISTANT_API_URL")
+# Largest accepted resume; keep server.maxUploadSize in .streamlit/config.toml in step
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", 10))
+
+
+@st.cache_resource
+def start_metrics_exporter():
+    """
+    Starts the Prometheus exporter once per server process when METRICS_PORT is set.
+    """
+    if os.getenv("METRICS_PORT"):
+        from src.telemetry import start_metrics_server
+
+        start_metrics_server()
+
+
+@st.cache_resource
+def load_graph():
+    """
+    Builds the workflow (and with it the LLM client) once per server process instead of on every rerun.
+    Runs are checkpointed, so a failed analysis can be resumed and its cold email regenerated.
+    """
+    return get_graph(checkpointed=True)
+
+
+def analyze_remotely(resume_file, job_description, timeout=300.0):
+    """
+    Submits the application to the job queue API and long-polls until a worker has finished it.
+    """
+    import time
+    import httpx
+
+    with httpx.Client(base_url=ASSISTANT_API_URL, timeout=60) as client:
+        submitted = client.post(
+            "/jobs",
+            data={"job_description": job_description},
+            files={"resume": (resume_file.name, resume_file, resume_file.type)},
+        )
+        submitted.raise_for_status()
+        job_id = submitted.json()["id"]
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            polled = client.get(f"/jobs/{job_id}", params={"wait": 25})
+            polled.raise_for_status()
+            job = polled.json()
+            if job["status"] == "done":
+                return job["result"]
+            if job["status"] == "failed":
+                raise RuntimeError(job.get("error") or "The analysis failed.")
+        raise TimeoutError("The analysis did not finish in time. Please try again.")
+
+
+start_metrics_exporter()
+
 # Custom styling
 st.markdown("""
 <style>
@@ -61,6 +116,103 @@ Upload your resume and paste a job description to:
 </div>
 """, unsafe_allow_html=True)
 
+def render_ats_analysis(ats_analysis):
+    """
+    Renders the ATS score, company and keyword lists.
+    """
+    ats_score = ats_analysis.get("job_description_match_score", 0)
+    matched_keywords = ats_analysis.get("matching_keywords", [])
+    missing_keywords = ats_analysis.get("missing_keywords", [])
+    company_name = ats_analysis.get("company_name", "Unknown Company")
+
+    # ATS Score with visual representation
+    score_class = "good-score" if ats_score >= 80 else "medium-score" if ats_score >= 60 else "bad-score"
+    st.markdown(f'<div class="section-header">ATS Compatibility Score</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="score-box {score_class}"><h1>{ats_score}%</h1></div>', unsafe_allow_html=True)
+    
+    # Company identification
+    st.markdown(f'<div class="section-header">Company Identified</div>', unsafe_allow_html=True)
+    st.markdown(f"<h3>{company_name}</h3>", unsafe_allow_html=True)
+    
+    # Keywords analysis
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown('<div class="section-header">Matched Keywords</div>', unsafe_allow_html=True)
+        if matched_keywords:
+            for keyword in matched_keywords:
+                st.markdown(f"✅ {keyword}")
+        else:
+            st.write("No keywords matched.")
+    
+    with col2:
+        st.markdown('<div class="section-header">Missing Keywords</div>', unsafe_allow_html=True)
+        if missing_keywords:
+            for keyword in missing_keywords:
+                st.markdown(f"❌ {keyword}")
+        else:
+            st.write("No missing keywords.")
+
+
+def render_suggestions(ats_analysis):
+    """
+    Renders the resume edit suggestions.
+    """
+    edit_suggestions = ats_analysis.get("resume_edit_suggestions", [])
+    st.markdown('<div class="section-header">Resume Edit Suggestions</div>', unsafe_allow_html=True)
+    if edit_suggestions:
+            st.markdown(edit_suggestions)
+            st.divider()
+    else:
+        st.write("No suggestions available.")
+
+
+def render_potential_emails(potential_emails):
+    """
+    Renders the contacts found for the company.
+    """
+    if potential_emails:
+        import pandas as pd
+
+        st.markdown('<div class="section-header">Potential Contacts</div>', unsafe_allow_html=True)
+        email_df = pd.DataFrame({"Email": potential_emails})
+        st.dataframe(email_df)
+    else:
+        st.warning("No potential email contacts found.")
+
+
+def render_cold_email(cold_mail, potential_emails):
+    """
+    Renders the final email template and the mail client button.
+    """
+    cold_mail_subject = cold_mail.get("subject", "")
+    cold_mail_body = cold_mail.get("main_body", "")
+
+    st.markdown('<div class="section-header">Email Template</div>', unsafe_allow_html=True)
+    st.markdown(f"**Subject:** {cold_mail_subject}")
+    st.text_area("Email Body", value=cold_mail_body, height=300)
+    
+    if potential_emails:
+        if st.button("Open Email Client"):
+            mailto_script = launch_email_client(cold_mail_body, potential_emails, cold_mail_subject)
+            st.markdown(mailto_script, unsafe_allow_html=True)
+
+
+def render_partial_cold_email(partial_args):
+    """
+    Renders the cold email while the LLM is still writing it.
+    """
+    from langchain_core.utils.json import parse_partial_json
+
+    draft = parse_partial_json(partial_args) or {}
+    # in fused mode the email is nested next to the ATS analysis
+    if "ats_analysis" in draft or "cold_email" in draft:
+        draft = draft.get("cold_email") or {}
+    st.markdown('<div class="section-header">Email Template</div>', unsafe_allow_html=True)
+    st.markdown(f"**Subject:** {draft.get('subject', '')}")
+    st.markdown(draft.get("main_body", "") + " ▌")
+
+
 # File upload for resume
 st.markdown('<div class="section-header">Upload Your Resume</div>', unsafe_allow_html=True)
 resume_file = st.file_uploader("Upload your resume (PDF or DOCX)", type=["pdf", "docx"])
@@ -71,103 +223,169 @@ job_description = st.text_area("Paste the job description here", height=200)
 
 # Process button
 if st.button("Analyze Application"):
-    if resume_file is not None and job_description:
-        st.info("Processing your application... Please wait.")
-        
-        # Save the uploaded file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{resume_file.name.split('.')[-1]}") as tmp_file:
-            tmp_file.write(resume_file.getvalue())
-            resume_path = tmp_file.name
+    if resume_file is not None and resume_file.size > MAX_UPLOAD_MB * 2 ** 20:
+        st.error(f"The resume is larger than {MAX_UPLOAD_MB:g} MB. Please upload a smaller file.")
+    elif resume_file is not None and job_description:
+        from src.telemetry import memory_profile
+
+        progress = st.empty()
+        progress.info("Processing your application... Please wait.")
         
         try:
-            # Process with the existing workflow
-            state = AgentState({
-                "job_description": job_description,
-                "resume_file": Path(resume_path)
-            })
-            
-            response = graph.invoke(state)
+            with memory_profile() as memory_report:
+                # Display results in tabs; each section is filled in as soon as its node finishes
+                tab1, tab2, tab3 = st.tabs(["ATS Analysis", "Resume Suggestions", "Cold Email Generator"])
+                with tab1:
+                    ats_placeholder = st.empty()
+                with tab2:
+                    suggestions_placeholder = st.empty()
+                with tab3:
+                    st.markdown('<div class="section-header">Cold Email Generator</div>', unsafe_allow_html=True)
+                    contacts_placeholder = st.empty()
+                    cold_mail_placeholder = st.empty()
             
-            # Extract information from the response
-            ats_score = response.get("ats_analysis_agent", {}).get("job_description_match_score", 0)
-            matched_keywords = response.get("ats_analysis_agent", {}).get("matching_keywords", [])
-            missing_keywords = response.get("ats_analysis_agent", {}).get("missing_keywords", [])
-            company_name = response.get("ats_analysis_agent", {}).get("company_name", "Unknown Company")
-            edit_suggestions = response.get("ats_analysis_agent", {}).get("resume_edit_suggestions", [])
+                response = {}
+                node_timings = {}
+                telemetry_nodes = {}
+                errors = []
+                cold_mail_args = ""
+                telemetry_summary = None
             
-            cold_mail_subject = response.get("cold_mail_writer_agent", {}).get("subject", "")
-            cold_mail_body = response.get("cold_mail_writer_agent", {}).get("main_body", "")
-            potential_emails = response.get("email_finder_agent", {}).get("emails", [])
-            
-            # Display results in tabs
-            tab1, tab2, tab3 = st.tabs(["ATS Analysis", "Resume Suggestions", "Cold Email Generator"])
-            
-            with tab1:
-                # ATS Score with visual representation
-                score_class = "good-score" if ats_score >= 80 else "medium-score" if ats_score >= 60 else "bad-score"
-                st.markdown(f'<div class="section-header">ATS Compatibility Score</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="score-box {score_class}"><h1>{ats_score}%</h1></div>', unsafe_allow_html=True)
+                if ASSISTANT_API_URL:
+                    # Thin client: a worker process runs the workflow and the result is fetched when done
+                    result = analyze_remotely(resume_file, job_description)
+                    node_timings = result.get("node_timings", {})
+                    telemetry_summary = result.get("telemetry")
+                    if result.get("error"):
+                        errors.append(result["error"])
+                    response = {k: v for k, v in result.items() if k not in ("node_timings", "telemetry", "error")}
+                    if "ats_analysis_agent" in response:
+                        with ats_placeholder.container():
+                            render_ats_analysis(response["ats_analysis_agent"])
+                        with suggestions_placeholder.container():
+                            render_suggestions(response["ats_analysis_agent"])
+                else:
+                    import uuid
+                    from src.cache import make_key
+
+                    # The upload is parsed straight from memory, no temporary file needed; getbuffer()
+                    # is a view of the uploaded bytes, so hashing and parsing work without copying them
+                    state = AgentState({
+                        "job_description": job_description,
+                        "resume_bytes": resume_file.getbuffer(),
+                        "resume_name": resume_file.name
+                    })
                 
-                # Company identification
-                st.markdown(f'<div class="section-header">Company Identified</div>', unsafe_allow_html=True)
-                st.markdown(f"<h3>{company_name}</h3>", unsafe_allow_html=True)
+                    # Analyzing the same application again continues its previous run, so steps that
+                    # already finished before a failure are not repeated
+                    run_key = make_key(state["resume_bytes"], job_description)
+                    if st.session_state.get("run_key") != run_key:
+                        # the previous application's checkpoints (upload and resume text) are no longer needed
+                        if st.session_state.get("thread_id"):
+                            delete_run(st.session_state["thread_id"])
+                        st.session_state["run_key"] = run_key
+                        st.session_state["thread_id"] = uuid.uuid4().hex
+                    thread_id = st.session_state["thread_id"]
+                    graph = load_graph()
                 
-                # Keywords analysis
-                col1, col2 = st.columns(2)
+                    # "updates" yields each node's output when it completes, "messages" yields LLM tokens as they arrive
+                    for mode, chunk in graph.stream(resume_point(graph, state, thread_id), run_config(thread_id),
+                                                    stream_mode=["updates", "messages"]):
+                        if mode == "messages":
+                            message, metadata = chunk
+                            if metadata.get("langgraph_node") not in ("cold_mail_writer", "fused_analysis") or "cold_mail_writer_agent" in response:
+                                continue
+                            # the email is produced as a structured-output tool call, so its JSON arguments stream in
+                            for tool_chunk in getattr(message, "tool_call_chunks", None) or []:
+                                cold_mail_args += tool_chunk.get("args") or ""
+                            if cold_mail_args:
+                                with cold_mail_placeholder.container():
+                                    render_partial_cold_email(cold_mail_args)
+                            continue
                 
-                with col1:
-                    st.markdown('<div class="section-header">Matched Keywords</div>', unsafe_allow_html=True)
-                    if matched_keywords:
-                        for keyword in matched_keywords:
-                            st.markdown(f"✅ {keyword}")
-                    else:
-                        st.write("No keywords matched.")
+                        for update in chunk.values():
+                            update = update or {}
+                            node_timings.update(update.get("node_timings", {}))
+                            telemetry_nodes.update(update.get("telemetry", {}).get("nodes", {}))
+                            if update.get("error"):
+                                errors.append(update["error"])
+                            # only the agent outputs are kept, not the extracted resume text
+                            response.update({k: v for k, v in update.items() if k in AGENT_OUTPUT_KEYS})
+                    
+                            if "ats_analysis_agent" in update:
+                                with ats_placeholder.container():
+                                    render_ats_analysis(update["ats_analysis_agent"])
+                                with suggestions_placeholder.container():
+                                    render_suggestions(update["ats_analysis_agent"])
                 
-                with col2:
-                    st.markdown('<div class="section-header">Missing Keywords</div>', unsafe_allow_html=True)
-                    if missing_keywords:
-                        for keyword in missing_keywords:
-                            st.markdown(f"❌ {keyword}")
-                    else:
-                        st.write("No missing keywords.")
+                    # nodes that finished in an earlier, resumed run are not streamed again
+                    if any(key not in response for key in AGENT_OUTPUT_KEYS):
+                        checkpoint = graph.get_state(run_config(thread_id)).values
+                        for key in AGENT_OUTPUT_KEYS:
+                            if key not in response and checkpoint.get(key):
+                                response[key] = checkpoint[key]
+                                if key == "ats_analysis_agent":
+                                    with ats_placeholder.container():
+                                        render_ats_analysis(response[key])
+                                    with suggestions_placeholder.container():
+                                        render_suggestions(response[key])
+                        del checkpoint
+                    del state
             
-            with tab2:
-                st.markdown('<div class="section-header">Resume Edit Suggestions</div>', unsafe_allow_html=True)
-                if edit_suggestions:
-                        st.markdown(edit_suggestions)
-                        st.divider()
-                else:
-                    st.write("No suggestions available.")
+                for error in errors:
+                    st.warning(error)
             
-            with tab3:
-                st.markdown('<div class="section-header">Cold Email Generator</div>', unsafe_allow_html=True)
-                
-                # Display potential emails if available
-                if potential_emails:
-                    st.markdown('<div class="section-header">Potential Contacts</div>', unsafe_allow_html=True)
-                    email_df = pd.DataFrame({"Email": potential_emails})
-                    st.dataframe(email_df)
-                else:
-                    st.warning("No potential email contacts found.")
-                
-                # Display email template
-                st.markdown('<div class="section-header">Email Template</div>', unsafe_allow_html=True)
-                st.markdown(f"**Subject:** {cold_mail_subject}")
-                st.text_area("Email Body", value=cold_mail_body, height=300)
-                
-                if potential_emails:
-                    if st.button("Open Email Client"):
-                        mailto_script = launch_email_client(cold_mail_body, potential_emails, cold_mail_subject)
-                        st.markdown(mailto_script, unsafe_allow_html=True)
+                if "ats_analysis_agent" not in response:
+                    with ats_placeholder.container():
+                        render_ats_analysis({})
+                    with suggestions_placeholder.container():
+                        render_suggestions({})
+            
+                potential_emails = response.get("email_finder_agent", {}).get("emails", [])
+                with contacts_placeholder.container():
+                    render_potential_emails(potential_emails)
+                with cold_mail_placeholder.container():
+                    render_cold_email(response.get("cold_mail_writer_agent", {}), potential_emails)
+            
+                progress.success("Analysis complete.")
+                if node_timings:
+                    st.caption(" | ".join(f"{node}: {seconds:.2f}s" for node, seconds in node_timings.items()))
+                if telemetry_nodes:
+                    from src.telemetry import summarize
+
+                    telemetry_summary = summarize(telemetry_nodes)
+                if telemetry_summary:
+                    with st.expander("Run metrics"):
+                        st.json(telemetry_summary)
                 
-            # Clean up the temporary file
-            os.unlink(resume_path)
+                # Only the compact result outlives the run; the upload and extracted text are released
+                st.session_state["result"] = response
+            
+            memory_report["session_result_kb"] = round(len(json.dumps(response, default=str)) / 1024, 1)
+            logging.info(f"Analysis memory profile: {memory_report}")
+            with st.expander("Memory profile"):
+                st.json(memory_report)
             
         except Exception as e:
             st.error(f"An error occurred during processing: {str(e)}")
     else:
         st.warning("Please upload your resume and enter a job description to continue.")
 
+# A new cold email for the last analysis, reusing its extracted resume and ATS analysis
+if st.session_state.get("thread_id") and st.button("Regenerate Cold Email"):
+    try:
+        with st.spinner("Writing a new cold email..."):
+            update = regenerate_cold_email(st.session_state["thread_id"])
+        if update.get("error"):
+            st.warning(update["error"])
+        else:
+            result = st.session_state.setdefault("result", {})
+            result["cold_mail_writer_agent"] = update.get("cold_mail_writer_agent", {})
+            potential_emails = (result.get("email_finder_agent") or {}).get("emails", [])
+            render_cold_email(result["cold_mail_writer_agent"], potential_emails)
+    except Exception as e:
+        st.error(f"An error occurred while regenerating the cold email: {str(e)}")
+
 # Footer
 st.markdown("---")
 st.markdown("© 2025 Job Application Assistant | Powered by AI")
\ No newline at end of file
@@ -1,36 +1,203 @@
+import os
+import asyncio
 import logging
-from typing import Dict, Union
-from src.utils import extract_from_doc, ResumeResponse, get_company_info, generate_cold_email
-from src.model import llm_model
-from src.prompt import prompt_template
+from pathlib import Path
+from typing import Dict, Tuple, Union
+from src.utils import (
+    extract_from_bytes, load_parsed_text, ResumeResponse, ApplicationResponse, get_company_info, generate_cold_email,
+    aget_company_info, agenerate_cold_email, raise_unexpected_errors,
+)
+from src.model import invoke_structured, ainvoke_structured, MODEL_ID
+from src.prompt import prompt_template, fused_prompt, PROMPT_VERSION
+from src.cache import SQLiteCache, make_key
+from src.compression import compress_prompt_inputs, COMPRESSION_SIGNATURE
+from src.ratelimit import RateLimitExceeded
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# "llm" asks the model for everything, "hybrid" replaces the model's score and keyword
+# lists with the deterministic local scorer, "local" skips the LLM call entirely.
+ATS_SCORING_MODE = os.getenv("ATS_SCORING_MODE", "llm").lower()
+
+# The model runs at temperature=0, so the same resume/JD pair always gets the same analysis.
+ats_cache = SQLiteCache(
+    "ats_analysis",
+    ttl=float(os.getenv("ATS_CACHE_TTL", 7 * 24 * 3600)),
+    max_entries=int(os.getenv("ATS_CACHE_MAX_ENTRIES", 1000)),
+)
+
+
+def ats_cache_key(resume_key: str, job_description: str, variant: str = "ats") -> str:
+    """
+    Cache key for an ATS analysis: the resume's content key (`make_key` of its bytes), the job
+    description, the prompt version, the LLM backend/model, the scoring mode and the prompt
+    compression settings. `variant` separates plain analyses from fused analysis + cold email results.
+    """
+    return make_key(
+        resume_key, job_description, PROMPT_VERSION, MODEL_ID, ATS_SCORING_MODE, COMPRESSION_SIGNATURE, variant
+    )
+
+
+def invalidate_ats_analysis(resume_bytes: bytes, job_description: str) -> bool:
+    """
+    Drops the cached ATS analysis (plain and fused) for a resume/job description pair.
+    """
+    resume_key = make_key(resume_bytes)
+    removed = ats_cache.invalidate(ats_cache_key(resume_key, job_description))
+    return ats_cache.invalidate(ats_cache_key(resume_key, job_description, "fused")) or removed
+
+def _local_analysis(resume_content: str, job_description: str) -> Dict:
+    # NumPy/SciPy are only imported once local scoring is actually used
+    from src.scorer import local_ats_analysis
+
+    return local_ats_analysis(resume_content, job_description)
+
+def _local_scores(resume_content: str, job_description: str) -> Dict:
+    from src.scorer import local_scorer
+
+    return local_scorer.score(resume_content, job_description)
+
+def score_resume(resume_content: str, job_description: str) -> Dict:
+    """
+    Produces the `ResumeResponse` dump for a resume/job description pair according to `ATS_SCORING_MODE`.
+    """
+    if ATS_SCORING_MODE == "local":
+        return _local_analysis(resume_content, job_description)
+    prompt_resume, prompt_job_description = compress_prompt_inputs(resume_content, job_description)
+    response = invoke_structured(
+        ResumeResponse, prompt_template.format(text=prompt_resume, job_description=prompt_job_description)
+    ).model_dump()
+    if ATS_SCORING_MODE == "hybrid":
+        response.update(_local_scores(resume_content, job_description))
+    return response
+
+async def ascore_resume(resume_content: str, job_description: str) -> Dict:
+    """
+    Async version of `score_resume`.
+    """
+    if ATS_SCORING_MODE == "local":
+        return _local_analysis(resume_content, job_description)
+    prompt_resume, prompt_job_description = compress_prompt_inputs(resume_content, job_description)
+    response = (await ainvoke_structured(
+        ResumeResponse, prompt_template.format(text=prompt_resume, job_description=prompt_job_description)
+    )).model_dump()
+    if ATS_SCORING_MODE == "hybrid":
+        response.update(_local_scores(resume_content, job_description))
+    return response
+
+def analyze_application(resume_content: str, job_description: str) -> Tuple[Dict, Dict]:
+    """
+    Produces the ATS analysis and the cold email with a single LLM call.
+
+    Falls back to the separate ATS and cold email calls if the fused call fails.
+    """
+    if ATS_SCORING_MODE == "local":
+        return _local_analysis(resume_content, job_description), generate_cold_email(resume_content, job_description)
+    try:
+        prompt_resume, prompt_job_description = compress_prompt_inputs(resume_content, job_description)
+        response = invoke_structured(
+            ApplicationResponse,
+            fused_prompt.format(resume_content=prompt_resume, job_description=prompt_job_description)
+        )
+    except Exception:
+        logging.exception("Fused analysis failed, falling back to separate LLM calls")
+        return score_resume(resume_content, job_description), generate_cold_email(resume_content, job_description)
+    ats_analysis = response.ats_analysis.model_dump()
+    if ATS_SCORING_MODE == "hybrid":
+        ats_analysis.update(_local_scores(resume_content, job_description))
+    return ats_analysis, response.cold_email.model_dump()
+
+async def aanalyze_application(resume_content: str, job_description: str) -> Tuple[Dict, Dict]:
+    """
+    Async version of `analyze_application`.
+    """
+    if ATS_SCORING_MODE == "local":
+        cold_mail = await agenerate_cold_email(resume_content, job_description)
+        return _local_analysis(resume_content, job_description), cold_mail
+    try:
+        prompt_resume, prompt_job_description = compress_prompt_inputs(resume_content, job_description)
+        response = await ainvoke_structured(
+            ApplicationResponse,
+            fused_prompt.format(resume_content=prompt_resume, job_description=prompt_job_description)
+        )
+    except Exception:
+        logging.exception("Fused analysis failed, falling back to separate LLM calls")
+        ats_analysis, cold_mail = await asyncio.gather(
+            ascore_resume(resume_content, job_description),
+            agenerate_cold_email(resume_content, job_description),
+        )
+        return ats_analysis, cold_mail
+    ats_analysis = response.ats_analysis.model_dump()
+    if ATS_SCORING_MODE == "hybrid":
+        ats_analysis.update(_local_scores(resume_content, job_description))
+    return ats_analysis, response.cold_email.model_dump()
+
+def has_resume(state) -> bool:
+    return bool(state.get("resume_key") or state.get("resume_bytes") or state.get("resume_file"))
+
+def resume_key(state) -> str:
+    """
+    Content key of the state's resume: `resume_key` when the upload was stored ahead of a
+    checkpointed run, otherwise `make_key` of its bytes.
+    """
+    if state.get("resume_key"):
+        return state["resume_key"]
+    return make_key(load_resume(state)[0])
+
+def resume_text(state) -> str:
+    """
+    The resume's extracted text. Checkpointed runs carry only `resume_key`, which is resolved
+    through the parsed-document store; uploads and files are extracted (and stored) on demand.
+    """
+    if state.get("resume_content"):
+        return state["resume_content"]
+    if state.get("resume_key"):
+        text = load_parsed_text(state["resume_key"])
+        if text is None:
+            raise ValueError("The uploaded resume is no longer available. Please upload it again.")
+        return text
+    resume_bytes, suffix = load_resume(state)
+    return extract_from_bytes(resume_bytes, suffix)
+
+def load_resume(state) -> Tuple[bytes, str]:
+    """
+    Returns the resume bytes and file extension, from the in-memory upload when present
+    and from `resume_file` otherwise.
+    """
+    if state.get("resume_bytes"):
+        return state["resume_bytes"], Path(state.get("resume_name") or "").suffix
+    resume_path = Path(state["resume_file"])
+    return resume_path.read_bytes(), resume_path.suffix
+
 def ats_analysis_agent(state):
     """
     Analyzes the resume against the job description and extracts ATS-related insights.
     """
     try:
-        resume_path = state.get("resume_file")
         job_description = state.get("job_description")
         
-        if not resume_path or not job_description:
+        if not has_resume(state) or not job_description:
             raise ValueError("Missing resume file or job description.")
         
-        resume_content = extract_from_doc(resume_path)
-        structured_response = llm_model.with_structured_output(ResumeResponse)
-        response = structured_response.invoke(
-            prompt_template.format(text=resume_content, job_description=job_description)
-        ).model_dump()
-        
-        state["resume_content"] = resume_content
-        state["ats_analysis_agent"] = response
-        return state
-    except ValueError as ve:
-        logging.error(f"ValueError: {ve}")
+        cache_key = ats_cache_key(resume_key(state), job_description)
+        cached = ats_cache.get(cache_key)
+        if cached is not None:
+            logging.info("ATS analysis served from cache.")
+            return {"ats_analysis_agent": cached["ats_analysis_agent"]}
+        
+        # the resume text stays out of the state; later nodes resolve it again from the parsed-document store
+        response = score_resume(resume_text(state), job_description)
+        
+        result = {"ats_analysis_agent": response}
+        ats_cache.set(cache_key, result)
+        return result
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.error(f"{type(ve).__name__}: {ve}")
         return {"error": str(ve)}
     except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
         logging.exception("Unexpected error in ats_analysis_agent")
         return {"error": "Internal server error in ATS analysis."}
 
@@ -45,12 +212,13 @@ def email_finder_agent(state):
             raise ValueError("Organization details not found.")
         
         response = get_company_info(company_name)
-        state["email_finder_agent"] = response
-        return state
-    except ValueError as ve:
-        logging.warning(f"ValueError: {ve}")
+        return {"email_finder_agent": response}
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.warning(f"{type(ve).__name__}: {ve}")
         return {"error": str(ve)}
     except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
         logging.exception("Unexpected error in email_finder_agent")
         return {"error": "Internal server error in email lookup."}
 
@@ -60,17 +228,158 @@ def cold_mail_writer_agent(state):
     """
     try:
         job_description = state.get("job_description", "").strip()
-        resume_content = state.get("resume_content", "").strip()
+        resume_content = resume_text(state).strip() if has_resume(state) or state.get("resume_content") else ""
         
         if not job_description or not resume_content:
             raise ValueError("Job description or resume content is missing.")
         
         cold_mail = generate_cold_email(resume_content, job_description)
-        state["cold_mail_writer_agent"] = cold_mail
-        return state
-    except ValueError as ve:
-        logging.warning(f"ValueError: {ve}")
+        return {"cold_mail_writer_agent": cold_mail}
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.warning(f"{type(ve).__name__}: {ve}")
         return {"error": str(ve)}
     except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
         logging.exception("Unexpected error in cold_mail_writer_agent")
-        return {"error": "Internal server error in cold mail generation."}
\ No newline at end of file
+        return {"error": "Internal server error in cold mail generation."}
+
+def fused_analysis_agent(state):
+    """
+    Fused mode: analyzes the resume and writes the cold email with a single LLM call.
+    """
+    try:
+        job_description = state.get("job_description")
+        
+        if not has_resume(state) or not job_description:
+            raise ValueError("Missing resume file or job description.")
+        
+        cache_key = ats_cache_key(resume_key(state), job_description, "fused")
+        cached = ats_cache.get(cache_key)
+        if cached is not None:
+            logging.info("Fused analysis served from cache.")
+            return {key: cached[key] for key in ("ats_analysis_agent", "cold_mail_writer_agent")}
+        
+        ats_analysis, cold_mail = analyze_application(resume_text(state), job_description)
+        
+        result = {"ats_analysis_agent": ats_analysis, "cold_mail_writer_agent": cold_mail}
+        if "error" not in cold_mail:
+            ats_cache.set(cache_key, result)
+        return result
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.error(f"{type(ve).__name__}: {ve}")
+        return {"error": str(ve)}
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        logging.exception("Unexpected error in fused_analysis_agent")
+        return {"error": "Internal server error in ATS analysis."}
+
+async def aats_analysis_agent(state):
+    """
+    Async version of `ats_analysis_agent`: file reads, extraction and the cache lookup
+    run in a worker thread and the LLM is awaited through its async API.
+    """
+    try:
+        job_description = state.get("job_description")
+        
+        if not has_resume(state) or not job_description:
+            raise ValueError("Missing resume file or job description.")
+        
+        cache_key = ats_cache_key(await asyncio.to_thread(resume_key, state), job_description)
+        cached = await asyncio.to_thread(ats_cache.get, cache_key)
+        if cached is not None:
+            logging.info("ATS analysis served from cache.")
+            return {"ats_analysis_agent": cached["ats_analysis_agent"]}
+        
+        resume_content = await asyncio.to_thread(resume_text, state)
+        response = await ascore_resume(resume_content, job_description)
+        
+        result = {"ats_analysis_agent": response}
+        await asyncio.to_thread(ats_cache.set, cache_key, result)
+        return result
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.error(f"{type(ve).__name__}: {ve}")
+        return {"error": str(ve)}
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        logging.exception("Unexpected error in aats_analysis_agent")
+        return {"error": "Internal server error in ATS analysis."}
+
+async def aemail_finder_agent(state):
+    """
+    Async version of `email_finder_agent` using the pooled async Hunter.io client.
+    """
+    try:
+        company_name = state.get("ats_analysis_agent", {}).get("company_name", "").strip()
+        
+        if not company_name or company_name.lower() == "<not found>":
+            raise ValueError("Organization details not found.")
+        
+        response = await aget_company_info(company_name)
+        return {"email_finder_agent": response}
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.warning(f"{type(ve).__name__}: {ve}")
+        return {"error": str(ve)}
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        logging.exception("Unexpected error in aemail_finder_agent")
+        return {"error": "Internal server error in email lookup."}
+
+async def acold_mail_writer_agent(state):
+    """
+    Async version of `cold_mail_writer_agent`.
+    """
+    try:
+        job_description = state.get("job_description", "").strip()
+        resume_content = ""
+        if has_resume(state) or state.get("resume_content"):
+            resume_content = (await asyncio.to_thread(resume_text, state)).strip()
+        
+        if not job_description or not resume_content:
+            raise ValueError("Job description or resume content is missing.")
+        
+        cold_mail = await agenerate_cold_email(resume_content, job_description)
+        return {"cold_mail_writer_agent": cold_mail}
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.warning(f"{type(ve).__name__}: {ve}")
+        return {"error": str(ve)}
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        logging.exception("Unexpected error in acold_mail_writer_agent")
+        return {"error": "Internal server error in cold mail generation."}
+
+async def afused_analysis_agent(state):
+    """
+    Async version of `fused_analysis_agent`.
+    """
+    try:
+        job_description = state.get("job_description")
+        
+        if not has_resume(state) or not job_description:
+            raise ValueError("Missing resume file or job description.")
+        
+        cache_key = ats_cache_key(await asyncio.to_thread(resume_key, state), job_description, "fused")
+        cached = await asyncio.to_thread(ats_cache.get, cache_key)
+        if cached is not None:
+            logging.info("Fused analysis served from cache.")
+            return {key: cached[key] for key in ("ats_analysis_agent", "cold_mail_writer_agent")}
+        
+        resume_content = await asyncio.to_thread(resume_text, state)
+        ats_analysis, cold_mail = await aanalyze_application(resume_content, job_description)
+        
+        result = {"ats_analysis_agent": ats_analysis, "cold_mail_writer_agent": cold_mail}
+        if "error" not in cold_mail:
+            await asyncio.to_thread(ats_cache.set, cache_key, result)
+        return result
+    except (ValueError, RateLimitExceeded) as ve:
+        logging.error(f"{type(ve).__name__}: {ve}")
+        return {"error": str(ve)}
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        logging.exception("Unexpected error in afused_analysis_agent")
+        return {"error": "Internal server error in ATS analysis."}
\ No newline at end of file
@@ -0,0 +1,229 @@
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from src.cache import make_key
+from src.utils import extract_from_bytes
+from src.agents import ats_cache, ats_cache_key, ascore_resume
+from src.scorer import local_scorer, local_ats_analysis
+from src.ratelimit import BATCH, request_priority, is_rate_limit_error
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def load_job_descriptions(jobs_path: Path) -> Iterator[Dict[str, str]]:
+    """
+    Reads job descriptions from a JSONL or CSV file.
+
+    Each record needs a `job_description` field; an optional `id` field is kept
+    in the output, otherwise the line number is used.
+    """
+    jobs_path = Path(jobs_path)
+    if jobs_path.suffix.lower() == ".csv":
+        with open(jobs_path, newline="", encoding="utf-8") as f:
+            rows = csv.DictReader(f)
+            for index, row in enumerate(rows):
+                yield {"id": row.get("id") or str(index), "job_description": row.get("job_description", "")}
+        return
+
+    if jobs_path.suffix.lower() in (".jsonl", ".ndjson"):
+        with open(jobs_path, encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield {"id": str(record.get("id", index)), "job_description": record.get("job_description", "")}
+        return
+
+    raise ValueError("Unsupported job file format. Only JSONL and CSV are supported.")
+
+
+class AdaptiveConcurrency:
+    """
+    Bounded worker slots whose limit halves on rate-limit errors and slowly grows back on success.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.active = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def on_success(self) -> None:
+        async with self._condition:
+            if self.limit < self.max_concurrency:
+                self.limit += 1
+                self._condition.notify_all()
+
+    async def on_rate_limit(self) -> None:
+        async with self._condition:
+            self.limit = max(1, self.limit // 2)
+            logging.warning(f"Rate limited, lowering batch concurrency to {self.limit}.")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def score_job(resume_content: str, resume_key: str, job: Dict[str, str],
+                    slots: AdaptiveConcurrency) -> Dict[str, Any]:
+    """
+    Scores the resume against one job description, the same way `ats_analysis_agent` does.
+    """
+    job_description = job["job_description"]
+    cache_key = ats_cache_key(resume_key, job_description)
+    # SQLite lookups stay off the event loop shared by every batch worker
+    cached = await asyncio.to_thread(ats_cache.get, cache_key)
+    if cached is not None:
+        return {"id": job["id"], **cached["ats_analysis_agent"]}
+
+    # retries and backoff happen inside `ascore_resume`; an error here is final for this job
+    await slots.acquire()
+    try:
+        # interactive requests go first when the LLM quota is saturated
+        with request_priority(BATCH):
+            response = await ascore_resume(resume_content, job_description)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            await slots.on_rate_limit()
+        raise
+    finally:
+        await slots.release()
+    await slots.on_success()
+    await asyncio.to_thread(ats_cache.set, cache_key, {"ats_analysis_agent": response})
+    return {"id": job["id"], **response}
+
+
+async def score_batch(resume_path: Path, jobs_path: Path, output_path: Path,
+                      concurrency: int = 8, prefilter_top: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Scores one resume against every job description in `jobs_path`.
+
+    The resume is extracted once. Results are streamed to `<output>.partial` as they
+    complete, then written to `output_path` sorted by `job_description_match_score`.
+    With `prefilter_top`, every job is first ranked by the local keyword scorer and
+    only the best N go to the LLM; the rest keep their local scores.
+
+    Returns:
+        dict: Run report with throughput and latency percentiles.
+    """
+    resume_path, output_path = Path(resume_path), Path(output_path)
+    resume_bytes = resume_path.read_bytes()
+    resume_content = extract_from_bytes(resume_bytes, resume_path.suffix)
+    resume_key = make_key(resume_bytes)
+    slots = AdaptiveConcurrency(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    latencies: List[float] = []
+    failures = 0
+
+    jobs: Iterable[Dict[str, str]] = load_job_descriptions(jobs_path)
+    local_results: List[Dict[str, Any]] = []
+    if prefilter_top is not None:
+        jobs = list(jobs)
+        scores = local_scorer.rank(resume_content, [job["job_description"] for job in jobs])
+        shortlist = set(np.argsort(-scores, kind="stable")[:prefilter_top].tolist())
+        # excluded jobs report the same IDF-weighted score the shortlist was picked by,
+        # so no excluded job outscores one that went to the LLM
+        local_results = [
+            {"id": job["id"], **local_ats_analysis(resume_content, job["job_description"]),
+             "job_description_match_score": int(scores[index]), "scored_by": "local"}
+            for index, job in enumerate(jobs) if index not in shortlist
+        ]
+        jobs = [job for index, job in enumerate(jobs) if index in shortlist]
+        logging.info(f"Local pre-filter kept {len(jobs)} of {len(jobs) + len(local_results)} jobs for the LLM.")
+
+    async def producer():
+        for job in jobs:
+            await queue.put(job)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker(out):
+        nonlocal failures
+        while (job := await queue.get()) is not None:
+            start = time.perf_counter()
+            try:
+                result = await score_job(resume_content, resume_key, job, slots)
+            except Exception as e:
+                logging.exception(f"Failed to score job {job['id']}")
+                failures += 1
+                result = {"id": job["id"], "error": str(e)}
+            latencies.append(time.perf_counter() - start)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    started = time.perf_counter()
+    with open(partial_path, "w", encoding="utf-8") as out:
+        for result in local_results:
+            out.write(json.dumps(result) + "\n")
+        await asyncio.gather(producer(), *(worker(out) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    with open(partial_path, encoding="utf-8") as f:
+        results = [json.loads(line) for line in f]
+    results.sort(key=lambda r: r.get("job_description_match_score", -1), reverse=True)
+    with open(output_path, "w", encoding="utf-8") as out:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    partial_path.unlink()
+
+    return {
+        "jobs": len(latencies) + len(local_results),
+        "llm_scored": len(latencies),
+        "failures": failures,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 50), 3),
+        "latency_p95_seconds": round(percentile(latencies, 95), 3),
+        "latency_p99_seconds": round(percentile(latencies, 99), 3),
+    }
+
+
+def run_batch(resume_path: Path, jobs_path: Path, output_path: Path, concurrency: int = 8,
+              prefilter_top: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Synchronous wrapper around `score_batch`, usable next to `graph.invoke`.
+    """
+    return asyncio.run(score_batch(resume_path, jobs_path, output_path, concurrency, prefilter_top))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score one resume against many job descriptions.")
+    parser.add_argument("resume", type=Path, help="Resume file (PDF or DOCX).")
+    parser.add_argument("jobs", type=Path, help="Job descriptions (JSONL or CSV with a job_description column).")
+    parser.add_argument("-o", "--output", type=Path, default=Path("batch_results.jsonl"))
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--prefilter-top", type=int, default=None,
+                        help="Only send the N best jobs by local keyword score to the LLM.")
+    args = parser.parse_args(argv)
+
+    report = run_batch(args.resume, args.jobs, args.output, args.concurrency, args.prefilter_top)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
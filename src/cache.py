@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CACHE_PATH = Path(os.getenv("CACHE_PATH", ".cache/assistant_cache.sqlite"))
+
+
+def make_key(*parts: Union[str, bytes, memoryview]) -> str:
+    """
+    Builds a content-addressed cache key from the given parts.
+
+    Each part is length-prefixed before hashing so ("ab", "c") and ("a", "bc") never collide.
+    Bytes-like parts (e.g. a memoryview of an upload) are hashed in place, without a copy.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = memoryview(part).cast("B") if isinstance(part, (bytes, bytearray, memoryview)) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class SQLiteCache:
+    """
+    Persistent JSON cache stored in a local SQLite file.
+
+    Entries live in a namespace, expire after `ttl` seconds and the least recently
+    used ones are evicted once the namespace holds more than `max_entries`.
+    """
+
+    def __init__(self, namespace: str, path: Optional[Path] = None,
+                 ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.path = Path(path or CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, last_access)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        """
+        Returns the cached value for `key`, or None when it is missing or expired.
+        With `count=False` the lookup is left out of the hit/miss statistics.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is None:
+                    self.misses += count
+                    return None
+                value, expires_at = row
+                if expires_at is not None and expires_at <= now:
+                    conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    conn.commit()
+                    self.misses += count
+                    return None
+                self.hits += count
+                conn.execute(
+                    "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+                conn.commit()
+                return json.loads(value)
+            finally:
+                conn.close()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores a JSON-serializable value, overriding the namespace TTL when `ttl` is given.
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), now, expires_at, now),
+                )
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                        "SELECT key FROM cache WHERE namespace = ? ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                        (self.namespace, self.namespace, self.max_entries),
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Removes a single entry. Returns True if something was deleted.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                conn.commit()
+                return cursor.rowcount > 0
+            finally:
+                conn.close()
+
+    def clear(self) -> int:
+        """
+        Removes every entry in the namespace and returns how many were deleted.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def purge_expired(self) -> int:
+        """
+        Drops expired entries from the namespace and returns how many were deleted.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                    (self.namespace, time.time()),
+                )
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Hit/miss counters of this process plus the number of stored entries.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                entries = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            finally:
+                conn.close()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single call whose result is shared.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[Any, asyncio.Future] = {}
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any], recheck: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Runs `fn` unless another thread is already running it for `key`, in which case
+        its result (or exception) is reused.
+
+        `recheck` is called first by the thread that runs the call; if it returns a value
+        (e.g. the cache entry a call that just finished has written), `fn` is skipped.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            if recheck is not None:
+                call["result"] = recheck()
+                self.shared += call["result"] is not None
+            if call["result"] is None:
+                call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]],
+                  recheck: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """
+        Async version of `do` for coroutines running on the same event loop.
+        """
+        async def run():
+            if recheck is not None:
+                result = await recheck()
+                if result is not None:
+                    self.shared += 1
+                    return result
+            return await fn()
+
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(run())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
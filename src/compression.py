@@ -0,0 +1,206 @@
+import os
+import re
+import logging
+from typing import List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PROMPT_COMPRESSION = os.getenv("PROMPT_COMPRESSION", "1") != "0"
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", 2500))
+JOB_DESCRIPTION_TOKEN_BUDGET = int(os.getenv("JOB_DESCRIPTION_TOKEN_BUDGET", 1500))
+MIN_DEDUPE_WORDS = 5
+
+# Bump when the compression rules change so cached results of the old prompts are not reused
+COMPRESSION_VERSION = 3
+# Part of LLM cache keys, since different budgets produce different prompts.
+COMPRESSION_SIGNATURE = (
+    f"{COMPRESSION_VERSION}:{int(PROMPT_COMPRESSION)}:{RESUME_TOKEN_BUDGET}:{JOB_DESCRIPTION_TOKEN_BUDGET}"
+)
+
+# Headings of job description sections that describe the employer rather than the job. Only
+# these phrases count, so a requirement that starts with "About" or "Benefits" is never a heading.
+BOILERPLATE_HEADING = re.compile(
+    r"^(introduction|about us|who we are|our (story|culture|mission)|your life @ .+|life at .+|"
+    r"why (join|work (with|at)) .+|(our )?(benefits|perks)( (and|&) (perks|benefits))?|what we offer|"
+    r"equal (employment )?opportunity( employer| statement)?|eeo( statement)?|"
+    r"diversity( (and|&) inclusion)?( statement)?|other relevant job details|disclaimer|privacy (notice|policy))$",
+    re.IGNORECASE,
+)
+# "About <company>": a capitalized name without digits, unlike "About 50% travel required" or "About the job"
+COMPANY_HEADING = re.compile(r"^[Aa]bout (?!(The|the|This|this|Us|us|You|you|Your|your|Our|our)\b)[A-Z][\w&.'-]*( [A-Z&][\w&.'-]*){0,3}$")
+# List markers that start a bullet or numbered line
+BULLET = re.compile(r"^([-*•·▪◦–—]|\d+[.)])\s")
+EEO_LINE = re.compile(
+    r"equal (employment )?opportunity employer|without regard to (race|color|religion)|"
+    r"reasonable accommodation|e-verify",
+    re.IGNORECASE,
+)
+
+# (job description, expected `strip_boilerplate` output); run with `python -m src.compression`
+BOILERPLATE_CASES = [
+    # requirements that start with a heading word are job content, not headings
+    ("Requirements\nAbout 50% travel required\nOwn Terraform modules and CI/CD pipelines.\n"
+     "Deploy and tune Kubernetes clusters for customers.",
+     "Requirements\nAbout 50% travel required\nOwn Terraform modules and CI/CD pipelines.\n"
+     "Deploy and tune Kubernetes clusters for customers."),
+    ("Qualifications\nBenefits analytics domain experience\nStrong SQL skills.",
+     "Qualifications\nBenefits analytics domain experience\nStrong SQL skills."),
+    ("About the role\nBuild data pipelines. Python and Airflow required.",
+     "About the role\nBuild data pipelines. Python and Airflow required."),
+    # real boilerplate sections go; the company heading stays
+    ("Data Engineer\n\nAbout Acme\nAcme builds rockets.\n\nBenefits:\n- Free lunch\n- Gym\n\n"
+     "Requirements\n- Python\n\nEqual Opportunity Employer\nWe hire without regard to race.",
+     "Data Engineer\n\nAbout Acme\nRequirements\n- Python\n"),
+    ("Data Engineer\n\nAbout us\nWe build rockets.\n\nResponsibilities\n- Own the warehouse",
+     "Data Engineer\n\nResponsibilities\n- Own the warehouse"),
+]
+
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """
+    Loads the tiktoken encoding on first use; tiktoken is optional.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # fall back to a word/punctuation estimate
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken when installed, otherwise approximates them by words and punctuation.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN.findall(text))
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """
+    Keeps the beginning of `text` up to `budget` tokens.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= budget else encoding.decode(tokens[:budget])
+    if budget <= 0:
+        return ""
+    matches = list(_APPROX_TOKEN.finditer(text))
+    return text if len(matches) <= budget else text[:matches[budget - 1].end()]
+
+
+def _is_heading(line: str) -> bool:
+    # bullets such as "- Free lunch" are short but belong to the section they are in
+    return not BULLET.match(line) and len(line) <= 60 and not line.endswith((".", ",", ";")) and len(line.split()) <= 8
+
+
+def strip_boilerplate(text: str) -> str:
+    """
+    Drops employer boilerplate sections ("Introduction", "About us", benefits, EEO text)
+    from a job description.
+
+    A section starts at a known heading phrase that stands on its own line after a blank
+    line (or ends with a colon) and runs to the next heading. "About <company>" headings
+    are kept so the company can still be identified; their sections are dropped.
+    """
+    kept: List[str] = []
+    skipping = False
+    previous_blank = True
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and _is_heading(stripped):
+            heading = stripped.rstrip(":").strip()
+            in_context = previous_blank or stripped.endswith(":")
+            company = in_context and bool(COMPANY_HEADING.match(heading))
+            skipping = in_context and (company or bool(BOILERPLATE_HEADING.match(heading)))
+            if company:
+                kept.append(line)
+            previous_blank = False
+            if skipping:
+                continue
+        previous_blank = not stripped
+        if skipping or EEO_LINE.search(stripped):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses whitespace, removes blank-line runs and drops repeated lines. Only lines of
+    several words are deduplicated, so short repeated entries like dates are kept.
+    """
+    seen = set()
+    lines: List[str] = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        key = line.lower()
+        if len(line.split()) >= MIN_DEDUPE_WORDS:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def compress_text(text: str, budget: int, boilerplate: bool = False) -> str:
+    """
+    Normalizes `text`, optionally strips job description boilerplate, and truncates it to `budget` tokens.
+    """
+    if boilerplate:
+        text = strip_boilerplate(text)
+    return truncate_to_budget(normalize_text(text), budget)
+
+
+def compress_prompt_inputs(resume_content: str, job_description: str) -> Tuple[str, str]:
+    """
+    Shrinks the resume and job description before they are pasted into an LLM prompt,
+    logging the token counts before and after.
+    """
+    if not PROMPT_COMPRESSION:
+        return resume_content, job_description
+
+    before = count_tokens(resume_content) + count_tokens(job_description)
+    resume_content = compress_text(resume_content, RESUME_TOKEN_BUDGET)
+    job_description = compress_text(job_description, JOB_DESCRIPTION_TOKEN_BUDGET, boilerplate=True)
+    after = count_tokens(resume_content) + count_tokens(job_description)
+    logging.info(f"Prompt inputs compressed from {before} to {after} tokens.")
+    return resume_content, job_description
+
+
+def check_boilerplate() -> List[str]:
+    """
+    Runs `strip_boilerplate` over BOILERPLATE_CASES and describes every mismatch.
+    """
+    failures = []
+    for text, expected in BOILERPLATE_CASES:
+        actual = strip_boilerplate(text)
+        if actual != expected:
+            failures.append(f"{text!r}\n  expected {expected!r}\n  got      {actual!r}")
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    failures = check_boilerplate()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(BOILERPLATE_CASES) - len(failures)}/{len(BOILERPLATE_CASES)} boilerplate cases passed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,288 @@
+import os
+import json
+import math
+import zlib
+import sqlite3
+import logging
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# The sentence-transformers model used when the package is installed; "hashing" always uses
+# the dependency-free hashing embedder, which is also the fallback without the package
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+HASHING_DIMENSIONS = 1024
+INDEX_PATH = Path(os.getenv("EMBEDDING_INDEX_PATH", ".cache/jd_index"))
+# Rows scored per matrix product, so search memory stays bounded on large indexes
+SEARCH_CHUNK_ROWS = 65536
+EMBED_BATCH_SIZE = 256
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: the local scorer's keywords hashed into a fixed number of
+    signed buckets, log-scaled with skills boosted, and L2-normalized.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        from src.scorer import local_scorer, SKILL_BOOST
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, count in local_scorer.keywords(text).items():
+                digest = zlib.crc32(term.encode("utf-8"))
+                weight = 1.0 + math.log(count)
+                if term in local_scorer.skills:
+                    weight *= SKILL_BOOST
+                vectors[row, digest % self.dimensions] += weight if digest & 0x80000000 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    """
+    CPU sentence-transformers model; vectors come back L2-normalized.
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(
+            list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def get_embedder(model_name: str = EMBEDDING_MODEL):
+    """
+    Returns the sentence-transformers embedder when installed, otherwise the hashing embedder.
+    """
+    if model_name and model_name != "hashing":
+        try:
+            embedder = SentenceTransformerEmbedder(model_name)
+            logging.info(f"Using the {embedder.name} embedder.")
+            return embedder
+        except ImportError:
+            logging.warning(
+                f"sentence-transformers is not installed, falling back to the hashing embedder instead of {model_name}: "
+                "search matches keywords only. Install sentence-transformers for semantic search, "
+                "or set EMBEDDING_MODEL=hashing to silence this warning."
+            )
+    return HashingEmbedder()
+
+
+class EmbeddingIndex:
+    """
+    Append-only cosine index of job descriptions.
+
+    Vectors live in a flat float32 file that is memory-mapped for search; ids and texts
+    live in SQLite next to it, row-aligned with the vectors.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH, embedder=None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.embedder = embedder or get_embedder()
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+
+        meta_path = self.path / "meta.json"
+        meta = {"embedder": self.embedder.name, "dimensions": self.embedder.dimensions}
+        if meta_path.exists():
+            stored = json.loads(meta_path.read_text())
+            if stored != meta:
+                raise ValueError(
+                    f"Index at {self.path} was built with {stored}, not {meta}. Set EMBEDDING_MODEL to the "
+                    "index's model (\"hashing\" for the hashing embedder) or rebuild the index."
+                )
+        else:
+            meta_path.write_text(json.dumps(meta))
+
+        self._conn = sqlite3.connect(self.path / "documents.sqlite", check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (row INTEGER PRIMARY KEY, id TEXT UNIQUE, text TEXT)")
+        self._conn.commit()
+        # a process killed mid-write can leave a partial row at the end of the file
+        self._truncate(len(self))
+
+    def __len__(self) -> int:
+        if not self.vectors_path.exists():
+            return 0
+        return self.vectors_path.stat().st_size // (4 * self.embedder.dimensions)
+
+    def _known(self, ids: List[str]) -> set:
+        placeholders = ",".join("?" * len(ids))
+        return {row[0] for row in self._conn.execute(f"SELECT id FROM documents WHERE id IN ({placeholders})", ids)}
+
+    def _truncate(self, rows: int) -> None:
+        # Drops vectors past `rows`, e.g. a partly written batch. Rows that are already
+        # memory-mapped are never cut, since the matrix only grows under the lock.
+        row_bytes = 4 * self.embedder.dimensions
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size > rows * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+
+    def _get_matrix(self) -> np.ndarray:
+        rows = len(self)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.embedder.dimensions))
+        return self._matrix
+
+    def add(self, documents: Iterable[Tuple[str, str]], batch_size: int = EMBED_BATCH_SIZE) -> int:
+        """
+        Embeds and appends (id, text) pairs; ids already in the index are skipped.
+        Returns the number of documents added.
+        """
+        added = 0
+        batch: List[Tuple[str, str]] = []
+
+        def flush():
+            nonlocal added
+            unique = list(dict(batch).items())
+            batch.clear()
+            # skip documents that are already indexed before paying for their embeddings
+            with self._lock:
+                known = self._known([doc_id for doc_id, _ in unique])
+            unique = [(doc_id, text) for doc_id, text in unique if doc_id not in known]
+            if not unique:
+                return
+            vectors = self.embedder.embed([text for _, text in unique])
+            with self._lock:
+                # checked again under the lock, so concurrent adds of the same id cannot both insert it
+                known = self._known([doc_id for doc_id, _ in unique])
+                new = [index for index, (doc_id, _) in enumerate(unique) if doc_id not in known]
+                if not new:
+                    return
+                start = len(self)
+                # the documents are committed only after their vectors are written; on failure both are undone
+                try:
+                    self._conn.executemany(
+                        "INSERT INTO documents (row, id, text) VALUES (?, ?, ?)",
+                        [(start + offset, *unique[index]) for offset, index in enumerate(new)],
+                    )
+                    with open(self.vectors_path, "ab") as f:
+                        f.write(np.ascontiguousarray(vectors[new], dtype=np.float32).tobytes())
+                    self._conn.commit()
+                except BaseException:
+                    self._conn.rollback()
+                    self._truncate(start)
+                    raise
+            added += len(new)
+
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return added
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns the `k` most similar job descriptions as {"id", "score", "job_description", "embedder"}, best first.
+        """
+        with self._lock:
+            matrix = self._get_matrix()
+        if matrix.shape[0] == 0:
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        k = min(k, matrix.shape[0])
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], SEARCH_CHUNK_ROWS):
+            scores = np.asarray(matrix[start:start + SEARCH_CHUNK_ROWS]) @ query_vector
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        order = np.argsort(-best_scores, kind="stable")[:k]
+
+        rows = [int(best_rows[i]) for i in order]
+        placeholders = ",".join("?" * len(rows))
+        documents = {
+            row: (doc_id, text)
+            for row, doc_id, text in self._conn.execute(f"SELECT row, id, text FROM documents WHERE row IN ({placeholders})", rows)
+        }
+        # vectors of an add that was interrupted before its commit have no document and are skipped
+        return [
+            {"id": documents[row][0], "score": round(float(best_scores[i]), 4), "job_description": documents[row][1],
+             "embedder": self.embedder.name}
+            for row, i in zip(rows, order) if row in documents
+        ]
+
+    def close(self) -> None:
+        self._matrix = None
+        self._conn.close()
+
+
+def rerank(resume_content: str, hits: List[Dict[str, Any]], top_n: int = 5, max_workers: int = 4) -> List[Dict[str, Any]]:
+    """
+    Scores the first `top_n` hits with the ATS scorer (`score_resume`, i.e. the `ResumeResponse`
+    LLM call) and orders them by `job_description_match_score`; the remaining hits follow unchanged.
+    """
+    from src.agents import score_resume
+
+    head, tail = hits[:top_n], hits[top_n:]
+
+    def score(hit):
+        try:
+            return {**hit, **score_resume(resume_content, hit["job_description"])}
+        except Exception as e:
+            logging.exception(f"Failed to rerank job {hit['id']}")
+            return {**hit, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scored = list(executor.map(score, head))
+    scored.sort(key=lambda hit: (hit.get("job_description_match_score", -1), hit["score"]), reverse=True)
+    return scored + tail
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build and query the job description embedding index.")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="Index directory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="Add job descriptions (JSONL or CSV) to the index.")
+    add_parser.add_argument("jobs", type=Path)
+
+    search_parser = subparsers.add_parser("search", help="Find the job descriptions that best fit a resume.")
+    search_parser.add_argument("resume", type=Path, help="Resume file (PDF or DOCX).")
+    search_parser.add_argument("-k", type=int, default=10)
+    search_parser.add_argument("--rerank", type=int, default=0, help="Re-score the best N hits with the LLM.")
+    args = parser.parse_args(argv)
+
+    index = EmbeddingIndex(args.index)
+    if args.command == "add":
+        from src.batch import load_job_descriptions
+
+        added = index.add((job["id"], job["job_description"]) for job in load_job_descriptions(args.jobs))
+        print(json.dumps({"added": added, "size": len(index), "embedder": index.embedder.name}))
+        return
+
+    from src.utils import extract_from_doc
+
+    resume_content = extract_from_doc(args.resume)
+    hits = index.search(resume_content, args.k)
+    if args.rerank:
+        hits = rerank(resume_content, hits, args.rerank)
+    for hit in hits:
+        hit["job_description"] = hit["job_description"][:200]
+    print(json.dumps(hits, indent=2))
+
+
+if __name__ == "__main__":
+    main()
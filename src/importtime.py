@@ -0,0 +1,88 @@
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from typing import Any, Dict, List, Optional
+
+# Cumulative import-time budgets in milliseconds; a module over budget fails the check
+IMPORT_BUDGETS_MS = {
+    "src.workflow": 150,
+    "src.agents": 400,
+}
+
+# Heavy dependencies that must not be pulled in just by importing the app modules
+LAZY_MODULES = ["langgraph", "langchain_groq", "langchain_core", "fitz", "docx", "httpx", "numpy", "scipy", "tiktoken"]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """
+    Imports `module` in a fresh interpreter with `python -X importtime` and parses the report.
+
+    Returns:
+        dict: Cumulative import time of the module, its slowest dependencies and which of
+        LAZY_MODULES were imported eagerly.
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": len(indent) // 2})
+
+    total_us = next((entry["cumulative_us"] for entry in entries if entry["module"] == module), 0)
+    imported = {entry["module"].split(".")[0] for entry in entries}
+    slowest = sorted(entries, key=lambda entry: entry["self_us"], reverse=True)[:10]
+    return {
+        "module": module,
+        "cumulative_ms": round(total_us / 1000, 2),
+        "eager_heavy_imports": [name for name in LAZY_MODULES if name in imported],
+        "slowest_self_ms": {entry["module"]: round(entry["self_us"] / 1000, 2) for entry in slowest},
+    }
+
+
+def check_budgets(budgets: Dict[str, float], repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Measures every module in `budgets` (best of `repeat` runs) and flags regressions.
+    """
+    reports = []
+    for module, budget_ms in budgets.items():
+        runs = [measure_import(module) for _ in range(repeat)]
+        report = min(runs, key=lambda run: run["cumulative_ms"])
+        report["budget_ms"] = budget_ms
+        report["ok"] = report["cumulative_ms"] <= budget_ms and not report["eager_heavy_imports"]
+        reports.append(report)
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check module import times against a budget.")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: every module in IMPORT_BUDGETS_MS).")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Budget applied to the given modules.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    budgets = dict(IMPORT_BUDGETS_MS)
+    if args.modules:
+        budgets = {module: args.budget_ms or IMPORT_BUDGETS_MS.get(module, 500) for module in args.modules}
+    elif args.budget_ms:
+        budgets = {module: args.budget_ms for module in budgets}
+
+    reports = check_budgets(budgets, args.repeat)
+    print(json.dumps(reports, indent=2))
+    sys.exit(0 if all(report["ok"] for report in reports) else 1)
+
+
+if __name__ == "__main__":
+    main()
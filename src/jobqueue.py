@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+QUEUE_PATH = Path(os.getenv("QUEUE_PATH", ".cache/jobs.sqlite"))
+# Finished and failed jobs (with their results) are deleted this long after they finish
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_HOURS", 24)) * 3600
+
+
+class JobQueue:
+    """
+    Durable job queue stored in a local SQLite file, shared by the API and the worker processes.
+
+    Jobs move from "queued" to "running" to "done" or "failed". Claiming is atomic, so any
+    number of workers can poll the same file. Finished jobs are kept for JOB_RETENTION_SECONDS
+    (see `prune_finished`).
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or QUEUE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    job_description TEXT,
+                    resume_bytes BLOB,
+                    resume_name TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, job_description: str, resume_bytes: bytes, resume_name: str) -> str:
+        """
+        Adds an analyze request to the queue and returns its job ID.
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, status, job_description, resume_bytes, resume_name, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, job_description, resume_bytes, resume_name, time.time()),
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically takes the oldest queued job, or returns None when the queue is empty.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, job_description, resume_bytes, resume_name FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            conn.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        conn = self._connect()
+        try:
+            # the upload is no longer needed once the job is finished
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, resume_bytes = NULL WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, "done", result, None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, "failed", None, error)
+
+    def requeue_stale(self, timeout: float, max_attempts: int = 3) -> int:
+        """
+        Puts jobs whose worker died (running for longer than `timeout` seconds) back in the queue,
+        or fails them after `max_attempts`. Returns how many jobs were touched.
+        """
+        cutoff = time.time() - timeout
+        conn = self._connect()
+        try:
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker did not finish the job.', finished_at = ?, "
+                "resume_bytes = NULL WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (time.time(), cutoff, max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND started_at < ?",
+                (cutoff,),
+            ).rowcount
+            return failed + requeued
+        finally:
+            conn.close()
+
+    def prune_finished(self, max_age: float = JOB_RETENTION_SECONDS) -> int:
+        """
+        Deletes done and failed jobs that finished more than `max_age` seconds ago.
+        Returns the number of jobs deleted.
+        """
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - max_age,),
+            ).rowcount
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the status (and result once done) of a job, or None if it does not exist.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, status, result, error, attempts, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def depth(self) -> Dict[str, int]:
+        """
+        Number of jobs per status.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {status: count for status, count in rows}
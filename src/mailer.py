@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import queue
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.application import MIMEApplication
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config import load_env
+from src.ratelimit import get_limiter
+
+load_env()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+# "starttls" (default), "ssl" for implicit TLS, or "none" for a local test server such as aiosmtpd
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "starttls").lower()
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_TIMEOUT_SECONDS = 30.0
+
+_ADDRESS = re.compile(r"^[^@\s<>,;]+@[^@\s<>,;]+\.[^@\s<>,;]+$")
+
+
+class SMTPConnectionPool:
+    """
+    Up to `size` logged-in SMTP connections, reused across messages and threads.
+    """
+
+    def __init__(self, host: str, port: int, security: str = "starttls", username: Optional[str] = None,
+                 password: Optional[str] = None, size: int = SMTP_POOL_SIZE, timeout: float = SMTP_TIMEOUT_SECONDS):
+        if security not in ("starttls", "ssl", "none"):
+            raise ValueError(f"Unknown SMTP security mode '{security}'. Use starttls, ssl or none.")
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Lends a connection; it goes back to the pool unless the server dropped it.
+        """
+        with self._slots:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                server = self._connect()
+            try:
+                yield server
+            except smtplib.SMTPServerDisconnected:
+                server.close()
+                raise
+            except Exception:
+                self._idle.put(server)
+                raise
+            else:
+                self._idle.put(server)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class Mailer:
+    """
+    Sends the same message to many recipients over pooled SMTP connections, with bounded
+    concurrency and a send rate limit (RATE_LIMIT_SMTP, see src.ratelimit).
+    """
+
+    def __init__(self, sender: str, password: Optional[str] = None, host: str = SMTP_HOST, port: int = SMTP_PORT,
+                 security: str = SMTP_SECURITY, pool_size: int = SMTP_POOL_SIZE):
+        self.sender = sender
+        self.pool_size = max(1, pool_size)
+        self.pool = SMTPConnectionPool(host, port, security, sender, password, self.pool_size)
+        self.limiter = get_limiter("smtp")
+
+    def __enter__(self) -> "Mailer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def build_message(self, subject: str, body: str, attachment: Optional[Tuple[str, bytes]] = None) -> bytes:
+        """
+        Serializes the message once, without a "To" header; the body and the base64-encoded
+        attachment are shared by every recipient.
+        """
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        if attachment is not None:
+            filename, data = attachment
+            part = MIMEApplication(data, Name=filename)
+            part["Content-Disposition"] = f'attachment; filename="{filename}"'
+            msg.attach(part)
+        return msg.as_bytes(policy=policy.SMTP)
+
+    def _send_one(self, recipient: str, message: bytes) -> Dict[str, Any]:
+        if not _ADDRESS.match(recipient):
+            return {"recipient": recipient, "status": "failed", "error": "Invalid email address."}
+        data = b"To: " + recipient.encode("ascii", "ignore") + b"\r\n" + message
+        start = time.perf_counter()
+        try:
+            self.limiter.acquire()
+            # a pooled connection may have been closed by the server while idle; reconnect once
+            for attempt in range(2):
+                try:
+                    with self.pool.connection() as server:
+                        server.sendmail(self.sender, [recipient], data)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    if attempt:
+                        raise
+        except smtplib.SMTPRecipientsRefused as e:
+            code, reason = e.recipients.get(recipient, (None, b""))
+            return {"recipient": recipient, "status": "failed", "error": f"{code} {reason.decode(errors='replace')}".strip()}
+        except Exception as e:
+            logging.warning(f"Failed to send email to {recipient}: {e}")
+            return {"recipient": recipient, "status": "failed", "error": str(e)}
+        return {"recipient": recipient, "status": "sent", "seconds": round(time.perf_counter() - start, 4)}
+
+    def send_bulk(self, recipients: Iterable[str], subject: str, body: str,
+                  attachment: Optional[Tuple[str, bytes]] = None) -> Dict[str, Any]:
+        """
+        Sends the message to every recipient (duplicates removed) and reports the outcome of each one.
+        A failed recipient does not stop the others.
+
+        Returns:
+            dict: Sent/failed counts, elapsed time and a per-recipient "results" list.
+        """
+        unique: List[str] = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+        message = self.build_message(subject, body, attachment)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(unique) or 1)) as executor:
+            results = list(executor.map(lambda recipient: self._send_one(recipient, message), unique))
+        sent = sum(result["status"] == "sent" for result in results)
+        return {
+            "sent": sent,
+            "failed": len(results) - sent,
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+            "results": results,
+        }
+
+
+def send_bulk_email(sender: str, password: Optional[str], recipients: Iterable[str], subject: str, body: str,
+                    attachment: Optional[Tuple[str, bytes]] = None, **settings) -> Dict[str, Any]:
+    """
+    Sends one message to many recipients with a short-lived `Mailer`; `settings` override the SMTP_* defaults.
+    """
+    with Mailer(sender, password, **settings) as mailer:
+        return mailer.send_bulk(recipients, subject, body, attachment)
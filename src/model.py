@@ -1,30 +1,223 @@
 import os
+import json
+import asyncio
 import logging
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+import weakref
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+from src.config import load_env
+from src.telemetry import span
+from src.ratelimit import get_limiter, call_with_retries, acall_with_retries
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
 
 # Load API key from .env file
-load_dotenv()
+load_env()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# "groq" (default), "openai" for any OpenAI-compatible server, or "fake" for the offline replay model
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+MODEL_NAME = os.getenv("LLM_MODEL", "fake-replay" if LLM_BACKEND == "fake" else "llama-3.3-70b-versatile")
+# Identifies the backend and model in cache keys
+MODEL_ID = f"{LLM_BACKEND}/{MODEL_NAME}"
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 16))
+
+LLM_MAX_CONNECTIONS = 100
+
+_backends: Dict[str, Callable[[], "BaseChatModel"]] = {}
+_clients: Dict[str, "BaseChatModel"] = {}
+_clients_lock = threading.Lock()
+_sync_slots: Dict[str, threading.BoundedSemaphore] = {}
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def register_backend(name: str):
+    """
+    Registers a factory that builds the chat model of an LLM backend.
+    """
+    def decorator(factory: Callable[[], "BaseChatModel"]):
+        _backends[name] = factory
+        return factory
+
+    return decorator
+
+
+def _http_clients(backend: str) -> Dict:
+    """
+    Pooled HTTP clients for a backend that feed its rate-limit response headers to the limiter.
+    """
+    import httpx
+
+    limiter = get_limiter(backend)
+    limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, keepalive_expiry=30)
+
+    def observe(response):
+        limiter.update_from_headers(response.headers)
+
+    async def aobserve(response):
+        await limiter.aupdate_from_headers(response.headers)
 
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    logging.error("GROQ_API_KEY is missing from environment variables.")
-    raise EnvironmentError("GROQ_API_KEY is not set. Please check your .env file.")
+    return {
+        "http_client": httpx.Client(limits=limits, event_hooks={"response": [observe]}),
+        "http_async_client": httpx.AsyncClient(limits=limits, event_hooks={"response": [aobserve]}),
+    }
 
 
-try:
-    llm_model = ChatGroq(
-        model="llama-3.3-70b-versatile",
+@register_backend("groq")
+def _groq_backend() -> "BaseChatModel":
+    from langchain_groq import ChatGroq
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logging.error("GROQ_API_KEY is missing from environment variables.")
+        raise EnvironmentError("GROQ_API_KEY is not set. Please check your .env file.")
+
+    return ChatGroq(
+        model=MODEL_NAME,
         temperature=0,
         max_tokens=None,
         timeout=30,  # Setting a reasonable timeout
-        max_retries=2,
+        max_retries=0,  # retries are scheduled by src.ratelimit
+        **_http_clients("groq"),
     )
-    logging.info("LLM model initialized successfully.")
-except Exception as e:
-    logging.exception("Failed to initialize ChatGroq model.")
-    raise
+
+
+@register_backend("openai")
+def _openai_backend() -> "BaseChatModel":
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=MODEL_NAME,
+        base_url=os.getenv("LLM_BASE_URL", "http://localhost:8000/v1"),
+        api_key=os.getenv("LLM_API_KEY", "not-needed"),
+        temperature=0,
+        timeout=30,
+        max_retries=0,
+        **_http_clients("openai"),
+    )
+
+
+@register_backend("fake")
+def _fake_backend() -> "BaseChatModel":
+    from src.replay import ReplayChatModel
+
+    fixtures = {}
+    replay_path = os.getenv("LLM_REPLAY_PATH")
+    if replay_path:
+        with open(replay_path, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    return ReplayChatModel(fixtures=fixtures, latency=float(os.getenv("LLM_REPLAY_LATENCY", 0)))
+
+
+def get_llm(backend: Optional[str] = None) -> "BaseChatModel":
+    """
+    Returns the shared chat model of a backend, creating it on first use.
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    with _clients_lock:
+        if backend not in _clients:
+            if backend not in _backends:
+                raise ValueError(f"Unknown LLM backend '{backend}'. Available: {', '.join(sorted(_backends))}.")
+            try:
+                _clients[backend] = _backends[backend]()
+                logging.info(f"LLM model initialized successfully ({backend}).")
+            except Exception:
+                logging.exception(f"Failed to initialize the '{backend}' LLM backend.")
+                raise
+        return _clients[backend]
+
+
+@contextmanager
+def llm_slot(backend: Optional[str] = None):
+    """
+    Limits concurrent sync calls per backend to LLM_CONCURRENCY.
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    with _clients_lock:
+        slot = _sync_slots.setdefault(backend, threading.BoundedSemaphore(LLM_CONCURRENCY))
+    with slot:
+        yield
+
+
+@asynccontextmanager
+async def allm_slot(backend: Optional[str] = None):
+    """
+    Limits concurrent async calls per backend and event loop to LLM_CONCURRENCY.
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    slots = _async_slots.setdefault(asyncio.get_running_loop(), {})
+    slot = slots.setdefault(backend, asyncio.Semaphore(LLM_CONCURRENCY))
+    async with slot:
+        yield
+
+
+def _traced_config(record: Dict):
+    """
+    Returns the inherited runnable config (graph callbacks, streaming) plus the telemetry handler.
+    """
+    from langchain_core.runnables.config import ensure_config
+    from src.telemetry import llm_callback_handler
+
+    config = ensure_config()
+    handler = llm_callback_handler(record)
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = [*callbacks, handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+    return config
+
+
+def _count_retry(record: Dict):
+    def on_retry(error):
+        record["retries"] = record.get("retries", 0) + 1
+
+    return on_retry
+
+
+def invoke_structured(schema, prompt: str, backend: Optional[str] = None):
+    """
+    Calls the LLM with structured output, within the backend's rate limit and concurrency limit.
+    Rate limits and transient errors are retried with backoff (see src.ratelimit).
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    structured_response = get_llm(backend).with_structured_output(schema)
+    with span("llm", schema.__name__, backend=backend, model=MODEL_NAME) as record:
+        config = _traced_config(record)
+
+        def call():
+            with llm_slot(backend):
+                return structured_response.invoke(prompt, config=config)
+
+        return call_with_retries(call, get_limiter(backend), on_retry=_count_retry(record))
+
+
+async def ainvoke_structured(schema, prompt: str, backend: Optional[str] = None):
+    """
+    Async version of `invoke_structured`.
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    structured_response = get_llm(backend).with_structured_output(schema)
+    with span("llm", schema.__name__, backend=backend, model=MODEL_NAME) as record:
+        config = _traced_config(record)
+
+        async def call():
+            async with allm_slot(backend):
+                return await structured_response.ainvoke(prompt, config=config)
+
+        return await acall_with_retries(call, get_limiter(backend), on_retry=_count_retry(record))
+
+
+def __getattr__(name: str):
+    # `llm_model` used to be built at import time; keep it importable but create it lazily
+    if name == "llm_model":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
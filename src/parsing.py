@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+import fitz  # PyMuPDF
+from src.utils import parse_document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx")
+
+
+def _parse_pdf_chunk(path: str, start: int, stop: int) -> Dict[str, Any]:
+    """
+    Extracts pages [start, stop) of a PDF. Runs inside a worker process.
+
+    Errors are returned instead of raised so a corrupt file never takes the pool down.
+    """
+    try:
+        with fitz.open(path) as doc:
+            if doc.needs_pass:
+                return {"error": "PDF is encrypted."}
+            stop = min(stop, doc.page_count)
+            pages = [doc[index].get_text("text") for index in range(start, stop)]
+            return {"pages": pages, "page_count": doc.page_count}
+    except Exception as e:
+        return {"error": f"Failed to parse PDF: {e}"}
+
+
+def _parse_docx(path: str) -> Dict[str, Any]:
+    """
+    Extracts a DOCX file. Runs inside a worker process.
+    """
+    try:
+        parsed = parse_document(Path(path).read_bytes(), ".docx")
+        return {"pages": [parsed["text"]], "page_count": 1}
+    except Exception as e:
+        return {"error": f"Failed to parse DOCX: {e}"}
+
+
+class _FileJob:
+    """
+    Book-keeping for one file whose chunks may be spread over several workers.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # set when the file's first chunk is handed to a worker, so queued files do not time out
+        self.deadline: Optional[float] = None
+        self.started = time.perf_counter()
+        self.chunks: Dict[int, List[str]] = {}
+        self.pending = 0
+        self.crashes = 0
+        self.page_count: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def result(self) -> Dict[str, Any]:
+        pages = [page for start in sorted(self.chunks) for page in self.chunks[start]]
+        return {
+            "path": str(self.path),
+            "text": "" if self.error else "\n".join(pages),
+            "pages": [] if self.error else pages,
+            "page_count": 0 if self.error else (self.page_count or 0),
+            "error": self.error,
+            "seconds": round(time.perf_counter() - self.started, 4),
+        }
+
+
+def _kill_pool(executor: ProcessPoolExecutor) -> None:
+    # shutdown() cannot stop a task that is already running, so hung workers are terminated
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_documents(paths: Iterable[Path], max_workers: Optional[int] = None, chunk_pages: int = 32,
+                    timeout: float = 60.0, max_crashes: int = 2) -> Iterator[Dict[str, Any]]:
+    """
+    Parses many PDF/DOCX files in a process pool and yields one result per file as it completes.
+
+    Large PDFs are split into chunks of `chunk_pages` pages that are extracted in parallel.
+    Only a bounded number of files is in flight at a time, so memory stays flat however
+    long `paths` is. Files that are corrupt, encrypted, unsupported or slower than
+    `timeout` seconds (counted from when their first chunk starts) are yielded with an
+    "error" instead of stopping the run. A timed-out file's worker is killed and the pool
+    replaced; so is a pool whose worker crashed. Files that were on a crashed pool are
+    retried one at a time, and a file that is on the pool for `max_crashes` crashes is
+    given up on.
+
+    Yields:
+        dict: "path", "text", "pages", "page_count", "error" and "seconds" for each file.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_workers * 2
+    paths = iter(paths)
+    # chunks waiting for a worker; at most `max_workers` are submitted, so a submitted chunk is running
+    queued: Deque[Tuple[_FileJob, int]] = deque()
+    futures: Dict[Future, Tuple[_FileJob, int]] = {}
+    jobs: List[_FileJob] = []
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(job: _FileJob, start: int):
+        queued.append((job, start))
+        job.pending += 1
+
+    def restart_pool():
+        # interrupted chunks of unfinished files run again on the new pool, with a fresh clock
+        nonlocal executor
+        _kill_pool(executor)
+        interrupted = [(job, start) for job, start in futures.values() if job in jobs]
+        futures.clear()
+        for job, start in reversed(interrupted):
+            job.deadline = None
+            queued.appendleft((job, start))
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def dispatch():
+        while queued and len(futures) < max_workers:
+            # files that were on a crashed pool run alone, so a second crash is pinned on the right one
+            if queued[0][0].crashes and futures or any(job.crashes for job, _ in futures.values()):
+                return
+            job, start = queued.popleft()
+            if job.deadline is None:
+                job.deadline = time.monotonic() + timeout
+            try:
+                if job.path.suffix.lower() == ".pdf":
+                    future = executor.submit(_parse_pdf_chunk, str(job.path), start, start + chunk_pages)
+                else:
+                    future = executor.submit(_parse_docx, str(job.path))
+            except BrokenProcessPool:
+                queued.appendleft((job, start))
+                restart_pool()
+                continue
+            futures[future] = (job, start)
+
+    def fill():
+        while len(jobs) < max_in_flight:
+            path = next(paths, None)
+            if path is None:
+                return
+            job = _FileJob(Path(path))
+            if job.path.suffix.lower() not in SUPPORTED_SUFFIXES:
+                job.error = "Unsupported file format. Only PDF and DOCX are supported."
+                yield job.result()
+                continue
+            jobs.append(job)
+            submit(job, 0)
+
+    def finish(job: _FileJob):
+        jobs.remove(job)
+        for future, (owner, _) in list(futures.items()):
+            if owner is job:
+                future.cancel()
+                del futures[future]
+        for item in [item for item in queued if item[0] is job]:
+            queued.remove(item)
+        return job.result()
+
+    def crashed():
+        # every file with a chunk on the broken pool may be the culprit
+        logging.error("Document parsing worker crashed; restarting the pool.")
+        failed = []
+        for job in {job for job, _ in futures.values() if job in jobs}:
+            job.crashes += 1
+            if job.crashes >= max_crashes:
+                job.error = "Worker process crashed while parsing."
+                failed.append(job)
+        results = [finish(job) for job in failed]
+        restart_pool()
+        return results
+
+    try:
+        yield from fill()
+        dispatch()
+        while jobs:
+            deadlines = [job.deadline for job in jobs if job.deadline is not None]
+            wait_timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(list(futures), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future not in futures:
+                    continue
+                job, start = futures[future]
+                try:
+                    chunk = future.result()
+                except BrokenProcessPool:
+                    yield from crashed()
+                    break
+                except Exception as e:
+                    chunk = {"error": f"Worker failed: {e}"}
+                del futures[future]
+                job.pending -= 1
+
+                if chunk.get("error"):
+                    job.error = chunk["error"]
+                else:
+                    job.chunks[start] = chunk["pages"]
+                    if start == 0:
+                        # the first chunk tells us how many pages are left to fan out
+                        job.page_count = chunk["page_count"]
+                        if job.path.suffix.lower() == ".pdf":
+                            for next_start in range(chunk_pages, job.page_count, chunk_pages):
+                                submit(job, next_start)
+
+                if job.error or job.pending == 0:
+                    yield finish(job)
+
+            now = time.monotonic()
+            expired = [job for job in jobs if job.deadline is not None and job.deadline <= now]
+            if expired:
+                hung = any(job in expired for job, _ in futures.values())
+                for job in expired:
+                    job.error = f"Timed out after {timeout}s."
+                    yield finish(job)
+                if hung:
+                    restart_pool()
+
+            yield from fill()
+            dispatch()
+    finally:
+        _kill_pool(executor)
+
+
+def iter_document_paths(root: Path) -> Iterator[Path]:
+    """
+    Yields every PDF/DOCX file under `root` (or `root` itself if it is a file).
+    """
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield path
+
+
+def benchmark(root: Path, max_workers: Optional[int] = None, chunk_pages: int = 32,
+              timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Parses every document under `root` and reports throughput, including pages/sec per core.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    files = pages = failures = 0
+    started = time.perf_counter()
+    for result in parse_documents(iter_document_paths(root), max_workers, chunk_pages, timeout):
+        files += 1
+        pages += result["page_count"]
+        failures += bool(result["error"])
+    elapsed = time.perf_counter() - started
+    pages_per_second = pages / elapsed if elapsed else 0.0
+    return {
+        "files": files,
+        "pages": pages,
+        "failures": failures,
+        "workers": max_workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_second": round(files / elapsed, 3) if elapsed else 0.0,
+        "pages_per_second": round(pages_per_second, 3),
+        "pages_per_second_per_core": round(pages_per_second / max_workers, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Parse PDF/DOCX resumes in bulk with a process pool.")
+    parser.add_argument("command", choices=["parse", "bench"])
+    parser.add_argument("root", type=Path, help="File or directory of PDF/DOCX documents.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("parsed_documents.jsonl"))
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-pages", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-file timeout in seconds.")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        print(json.dumps(benchmark(args.root, args.workers, args.chunk_pages, args.timeout), indent=2))
+        return
+
+    with open(args.output, "w", encoding="utf-8") as out:
+        for result in parse_documents(iter_document_paths(args.root), args.workers, args.chunk_pages, args.timeout):
+            if result["error"]:
+                logging.warning(f"{result['path']}: {result['error']}")
+            out.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+# Bump whenever a prompt below changes so cached LLM results are not reused.
+PROMPT_VERSION = "2"
+
 prompt_template = """
     As an experienced Applicant Tracking System (ATS) analyst,
     with profound knowledge in technology, software engineering, data science, full stack web development, cloud enginner, 
@@ -38,4 +41,33 @@ cold_mail_prompt = """
     - Free of placeholder text like "[Company Name]" or "[specific achievement]"
     - Mention at the last that the resume is attached below
     Format as a ready-to-send email with subject line, greeting, body paragraphs, and signature.
-    """
\ No newline at end of file
+    """
+
+fused_prompt = """
+    You are an experienced Applicant Tracking System (ATS) analyst and a professional job applicant.
+    Analyze the resume against the job description below and complete BOTH tasks in one response.
+
+    RESUME:
+    {resume_content}
+
+    JOB DESCRIPTION:
+    {job_description}
+
+    Task 1 - ATS analysis (ats_analysis):
+    With profound knowledge in technology, software engineering, data science, full stack web development,
+    cloud engineering, devops and big data engineering, assign a percentage match based on key criteria,
+    pinpoint missing and matching keywords accurately, identify the company and job ID, and suggest
+    resume edits that integrate relevant keywords naturally without keyword stuffing.
+
+    Task 2 - Cold email (cold_email):
+    Write a concise, compelling cold email to the hiring team with:
+    1. Brief, professional subject line that mentions the specific position
+    2. Formal greeting (no need to include a specific name if not provided)
+    3. Opening paragraph that shows enthusiasm for the specific role (1-2 sentences)
+    4. Middle paragraph highlighting 3-4 specific qualifications from the resume that directly match requirements in the job description (use concrete achievements with metrics when possible)
+    5. Final paragraph with a clear call to action requesting an interview
+    6. Professional closing
+
+    The email should be 50-100 words, customized to both documents, confident but not arrogant,
+    free of placeholder text like "[Company Name]", and mention at the end that the resume is attached below.
+    """
@@ -0,0 +1,411 @@
+import os
+import re
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Request priorities; lower values are served first when a provider is saturated
+INTERACTIVE = 0
+BATCH = 1
+
+# Longest a caller may expect to wait for a token before its request is shed
+MAX_WAIT_SECONDS = {
+    INTERACTIVE: float(os.getenv("RATE_LIMIT_MAX_WAIT", 30)),
+    BATCH: float(os.getenv("RATE_LIMIT_BATCH_MAX_WAIT", 300)),
+}
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 4))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 30.0
+# Pause until the token window resets once fewer LLM tokens than this are left in it
+MIN_REMAINING_TOKENS = 1000
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Requests per second and burst size per provider; override with e.g. RATE_LIMIT_GROQ="0.5:5".
+# Response headers and 429s lower the effective rate at runtime. These are the limits of every
+# process sharing RATE_LIMIT_PATH together; hosts that do not share the file each need their
+# share of the provider quota, i.e. the quota divided by the number of hosts.
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "groq": (5.0, 10),
+    "openai": (50.0, 100),
+    "fake": (1000.0, 1000),
+    "hunter": (10.0, 15),
+    "smtp": (10.0, 10),
+}
+
+# Bucket state shared by every process of this host, next to the cache
+RATE_LIMIT_PATH = Path(os.getenv("RATE_LIMIT_PATH", Path(os.getenv("CACHE_PATH", ".cache/assistant_cache.sqlite")).with_name("ratelimits.sqlite")))
+# A waiting caller that stops re-checking (e.g. its process died) stops counting after this long
+WAITER_TTL_SECONDS = 5.0
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+_limiters: Dict[str, "RateLimiter"] = {}
+_limiters_lock = threading.Lock()
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class RateLimitExceeded(RuntimeError):
+    """
+    Raised when a request is shed because the provider's quota would not free up in time.
+    """
+
+
+@contextmanager
+def request_priority(priority: int):
+    """
+    Sets the priority of every rate-limited call made in this context (including tasks and threads started from it).
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a reset/retry-after header: plain seconds ("7"), Groq-style durations ("1m2.5s", "120ms")
+    or a Unix timestamp.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+        return max(0.0, seconds - time.time()) if seconds > 1e9 else seconds
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket for one provider, shared by every thread and process using the same RATE_LIMIT_PATH.
+
+    The bucket and its waiting callers live in SQLite, so API workers, queue workers and batch
+    CLIs on one host draw from a single provider quota, and waiting callers of a higher priority
+    are served first whichever process they run in. Rate-limit headers and 429s pause or slow the
+    bucket (halving its rate), and successes grow it back.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, path: Optional[Path] = None):
+        self.name = name
+        self.max_rate = rate
+        self.burst = burst
+        self.path = Path(path or RATE_LIMIT_PATH)
+        # requests throttled by the provider and shed by this process
+        self.throttled = 0
+        self.shed = 0
+        self._rate_seen = rate
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per limiter, used under `_lock`; transactions are explicit
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, tokens REAL, updated REAL, "
+                "rate REAL, blocked_until REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_waiters (name TEXT, waiter TEXT, priority INTEGER, "
+                "expires_at REAL, PRIMARY KEY (name, waiter))"
+            )
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _bucket(self):
+        # Yields the refilled bucket (a dict), the connection and the time inside a write
+        # transaction, and stores the bucket back unless the block raises
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT tokens, updated, rate, blocked_until FROM rate_limits WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row is None:
+                    row = (float(self.burst), now, self.max_rate, 0.0)
+                bucket = dict(zip(("tokens", "updated", "rate", "blocked_until"), row))
+                # the configured rate may have been lowered since the bucket was stored
+                bucket["rate"] = min(bucket["rate"], self.max_rate)
+                bucket["tokens"] = min(self.burst, bucket["tokens"] + max(0.0, now - bucket["updated"]) * bucket["rate"])
+                bucket["updated"] = now
+                yield bucket, conn, now
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (name, tokens, updated, rate, blocked_until) VALUES (?, ?, ?, ?, ?)",
+                    (self.name, bucket["tokens"], bucket["updated"], bucket["rate"], bucket["blocked_until"]),
+                )
+                conn.execute("COMMIT")
+                self._rate_seen = bucket["rate"]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _try_acquire(self, priority: int, waited: float, waiter: str) -> float:
+        # Takes a token and returns 0, or registers `waiter` and returns how long to wait before trying again
+        with self._bucket() as (bucket, conn, now):
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM rate_limit_waiters WHERE name = ? AND priority < ? AND expires_at > ?",
+                (self.name, priority, now),
+            ).fetchone()[0]
+            if now >= bucket["blocked_until"] and bucket["tokens"] >= 1 + ahead:
+                bucket["tokens"] -= 1
+                return 0.0
+            wait = max(bucket["blocked_until"] - now, (1 + ahead - bucket["tokens"]) / bucket["rate"], 0.001)
+            if waited + wait > MAX_WAIT_SECONDS.get(priority, MAX_WAIT_SECONDS[BATCH]):
+                self.shed += 1
+                raise RateLimitExceeded(f"Rate limit reached for {self.name}. Please try again shortly.")
+            # the registration expires unless renewed, so a crashed process does not hold others back
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_waiters (name, waiter, priority, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, waiter, priority, now + WAITER_TTL_SECONDS),
+            )
+            return wait
+
+    def _remove_waiter(self, waiter: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM rate_limit_waiters WHERE name = ? AND waiter = ?", (self.name, waiter)
+            )
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and returns the time waited.
+        """
+        priority = _priority.get()
+        waiter = uuid.uuid4().hex
+        waited = 0.0
+        registered = False
+        try:
+            while True:
+                wait = self._try_acquire(priority, waited, waiter)
+                if not wait:
+                    return waited
+                registered = True
+                # re-check regularly, headers may unblock the bucket early
+                wait = min(wait, 1.0)
+                time.sleep(wait)
+                waited += wait
+        finally:
+            if registered:
+                self._remove_waiter(waiter)
+
+    async def aacquire(self) -> float:
+        """
+        Async version of `acquire`.
+        """
+        priority = _priority.get()
+        waiter = uuid.uuid4().hex
+        waited = 0.0
+        registered = False
+        try:
+            while True:
+                wait = await asyncio.to_thread(self._try_acquire, priority, waited, waiter)
+                if not wait:
+                    return waited
+                registered = True
+                wait = min(wait, 1.0)
+                await asyncio.sleep(wait)
+                waited += wait
+        finally:
+            if registered:
+                await asyncio.to_thread(self._remove_waiter, waiter)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Pauses the bucket until the provider's window resets when its rate-limit headers
+        say the quota is used up (`x-ratelimit-remaining[-requests|-tokens]`, `retry-after`).
+        """
+        if not any(name.lower().startswith(("x-ratelimit-remaining", "retry-after")) for name in headers):
+            return
+        with self._bucket() as (bucket, conn, now):
+            for suffix, low in (("-requests", 0), ("-tokens", MIN_REMAINING_TOKENS), ("", 0)):
+                remaining = _header_number(headers, f"x-ratelimit-remaining{suffix}")
+                if remaining is None:
+                    continue
+                if suffix != "-tokens":
+                    bucket["tokens"] = min(bucket["tokens"], remaining)
+                if remaining <= low:
+                    reset = parse_duration(headers.get(f"x-ratelimit-reset{suffix}"))
+                    if reset:
+                        bucket["blocked_until"] = max(bucket["blocked_until"], now + reset)
+            retry_after = parse_duration(headers.get("retry-after"))
+            if retry_after:
+                bucket["blocked_until"] = max(bucket["blocked_until"], now + retry_after)
+
+    async def aupdate_from_headers(self, headers: Mapping[str, str]) -> None:
+        await asyncio.to_thread(self.update_from_headers, headers)
+
+    def on_success(self) -> None:
+        # nothing to grow back unless some process lowered the rate
+        if self._rate_seen >= self.max_rate:
+            return
+        with self._bucket() as (bucket, conn, now):
+            bucket["rate"] = min(self.max_rate, bucket["rate"] + self.max_rate / 20)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        with self._bucket() as (bucket, conn, now):
+            bucket["rate"] = max(self.max_rate / 64, bucket["rate"] / 2)
+            if retry_after:
+                bucket["blocked_until"] = max(bucket["blocked_until"], now + retry_after)
+            rate = bucket["rate"]
+        self.throttled += 1
+        logging.warning(f"Rate limited by {self.name}, lowering the request rate to {rate:.2f}/s.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._bucket() as (bucket, conn, now):
+            waiting = dict(conn.execute(
+                "SELECT priority, COUNT(*) FROM rate_limit_waiters WHERE name = ? AND expires_at > ? GROUP BY priority",
+                (self.name, now),
+            ).fetchall())
+        return {
+            "name": self.name,
+            "rate": round(bucket["rate"], 3),
+            "tokens": round(bucket["tokens"], 2),
+            "waiting": {INTERACTIVE: waiting.get(INTERACTIVE, 0), BATCH: waiting.get(BATCH, 0)},
+            "throttled": self.throttled,
+            "shed": self.shed,
+        }
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """
+    Returns the shared limiter of a provider, creating it on first use.
+    """
+    name = name.lower()
+    with _limiters_lock:
+        if name not in _limiters:
+            rate, burst = DEFAULT_LIMITS.get(name, (10.0, 20))
+            override = os.getenv(f"RATE_LIMIT_{name.upper()}")
+            if override:
+                rate_value, _, burst_value = override.partition(":")
+                rate = float(rate_value)
+                burst = int(burst_value) if burst_value else max(1, int(rate))
+            _limiters[name] = RateLimiter(name, rate, burst)
+        return _limiters[name]
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Best-effort check for provider rate-limit (HTTP 429) errors.
+    """
+    return (
+        isinstance(error, RateLimitExceeded)
+        or _status_code(error) == 429
+        or "rate limit" in str(error).lower()
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Rate limits, overloaded or failing upstreams and timeouts are worth retrying.
+    """
+    if isinstance(error, RateLimitExceeded):
+        return False
+    return (
+        is_rate_limit_error(error)
+        or _status_code(error) in RETRYABLE_STATUS_CODES
+        or "timeout" in type(error).__name__.lower()
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    The `retry-after` delay the provider sent with a failed response, if any.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return parse_duration(headers.get("retry-after"))
+
+
+def backoff_delay(attempt: int, minimum: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter, never shorter than the provider's `retry-after`.
+    """
+    return max(minimum or 0.0, random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+
+
+def _handle_failure(limiter: RateLimiter, error: Exception, attempt: int, max_retries: int) -> float:
+    # Returns the delay before the next attempt, or raises when the error is final
+    if not is_retryable_error(error):
+        raise error
+    delay = retry_after(error)
+    if is_rate_limit_error(error):
+        limiter.on_rate_limited(delay)
+    if attempt >= max_retries:
+        if is_rate_limit_error(error):
+            raise RateLimitExceeded(f"Rate limit reached for {limiter.name}. Please try again shortly.") from error
+        raise error
+    delay = backoff_delay(attempt, delay)
+    logging.warning(f"{limiter.name} call failed ({type(error).__name__}), retrying in {delay:.2f}s.")
+    return delay
+
+
+def call_with_retries(fn: Callable[[], Any], limiter: RateLimiter, max_retries: int = MAX_RETRIES,
+                      on_retry: Optional[Callable[[Exception], None]] = None) -> Any:
+    """
+    Calls `fn` within the limiter's quota, retrying rate limits and transient errors with backoff.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            delay = _handle_failure(limiter, e, attempt, max_retries)
+            if on_retry:
+                on_retry(e)
+            time.sleep(delay)
+        else:
+            limiter.on_success()
+            return result
+
+
+async def acall_with_retries(fn: Callable[[], Any], limiter: RateLimiter, max_retries: int = MAX_RETRIES,
+                             on_retry: Optional[Callable[[Exception], None]] = None) -> Any:
+    """
+    Async version of `call_with_retries`; `fn` returns an awaitable.
+    """
+    for attempt in range(max_retries + 1):
+        await limiter.aacquire()
+        try:
+            result = await fn()
+        except Exception as e:
+            # slowing the shared limiter down is a SQLite write, kept off the event loop
+            delay = await asyncio.to_thread(_handle_failure, limiter, e, attempt, max_retries)
+            if on_retry:
+                on_retry(e)
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.to_thread(limiter.on_success)
+            return result
@@ -0,0 +1,115 @@
+import json
+import time
+import asyncio
+import hashlib
+import httpx
+from typing import Any, Dict, List
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def _synthesize(schema: Dict[str, Any], seed: int) -> Any:
+    """
+    Builds a deterministic value matching a JSON schema.
+    """
+    if "properties" in schema or schema.get("type") == "object":
+        return {name: _synthesize(prop, seed + index) for index, (name, prop) in enumerate(schema.get("properties", {}).items())}
+    kind = schema.get("type")
+    if kind == "integer":
+        return seed % 101
+    if kind == "number":
+        return float(seed % 101)
+    if kind == "boolean":
+        return seed % 2 == 0
+    if kind == "array":
+        return [_synthesize(schema.get("items", {}), seed + index) for index in range(3)]
+    return f"replay-{seed % 1000}"
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Offline stand-in chat model for tests and load tests.
+
+    Structured-output calls replay a recorded response for the requested schema (picked
+    deterministically from the prompt) or synthesize one from the schema; plain calls echo
+    a fixed reply. `latency` seconds are added to every call.
+    """
+
+    fixtures: Dict[str, List[Dict[str, Any]]] = {}
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        kwargs.pop("ls_structured_output_format", None)
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages, tools=None) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        if not tools:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="replay response"))])
+
+        function = tools[0]["function"]
+        recorded = self.fixtures.get(function["name"])
+        args = recorded[seed % len(recorded)] if recorded else _synthesize(function.get("parameters", {}), seed)
+        message = AIMessage(
+            content="",
+            tool_calls=[{"name": function["name"], "args": args, "id": f"call_{seed}", "type": "tool_call"}],
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(json.dumps(args)) // 4,
+                "total_tokens": len(prompt) // 4 + len(json.dumps(args)) // 4,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+
+class HunterReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that answers Hunter.io domain searches from recorded responses, for
+    benchmarks and offline runs. `fixtures` maps lowercase company names to response bodies
+    under "companies"; other companies get one of "responses", picked deterministically.
+    """
+
+    def __init__(self, fixtures: Dict[str, Any], latency: float = 0.0):
+        self.companies = {name.lower(): body for name, body in fixtures.get("companies", {}).items()}
+        self.responses = fixtures.get("responses") or [{"data": {"domain": None, "emails": []}}]
+        self.latency = latency
+
+    @classmethod
+    def from_file(cls, path: str, latency: float = 0.0) -> "HunterReplayTransport":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), latency)
+
+    def _respond(self, request):
+        company = request.url.params.get("company", "").strip().lower()
+        body = self.companies.get(company)
+        if body is None:
+            seed = int(hashlib.sha256(company.encode("utf-8")).hexdigest()[:8], 16)
+            body = self.responses[seed % len(self.responses)]
+        return httpx.Response(200, json=body, request=request)
+
+    def handle_request(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(request)
+
+    async def handle_async_request(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(request)
@@ -0,0 +1,169 @@
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+from scipy import sparse
+
+# Multi-word skills are matched as a single keyword before the text is split into words.
+SKILL_VOCABULARY = [
+    "python", "java", "javascript", "typescript", "c++", "c#", "go", "golang", "rust", "scala", "kotlin",
+    "sql", "nosql", "r", "bash", "html", "css", "react", "angular", "vue", "node.js", "django", "flask",
+    "fastapi", "spring boot", "rest api", "graphql", "microservices", "machine learning", "deep learning",
+    "natural language processing", "nlp", "computer vision", "generative ai", "large language models",
+    "llm", "llms", "rag", "langchain", "langgraph", "pytorch", "tensorflow", "keras", "scikit-learn",
+    "pandas", "numpy", "spark", "pyspark", "hadoop", "kafka", "airflow", "dbt", "snowflake", "databricks",
+    "etl", "data pipelines", "data engineering", "data science", "data analysis", "statistics",
+    "aws", "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "ansible", "jenkins",
+    "ci/cd", "devops", "mlops", "linux", "git", "postgresql", "mysql", "mongodb", "redis", "elasticsearch",
+    "vector databases", "prompt engineering", "fine-tuning", "transformers", "hugging face", "agile",
+    "scrum", "unit testing", "system design", "distributed systems", "cloud computing", "api design",
+    "power bi", "tableau", "excel", "communication", "leadership", "problem solving",
+]
+
+STOPWORDS = set("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has have
+having he her here hers him his how i if in into is it its itself just may me more most must my no nor
+not of off on once only or other our ours out over own per same she should so some such than that the
+their theirs them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with within without would you your yours
+ability able across work working works role team teams year years experience experienced strong good
+great excellent including include includes new using use used well within help helps skills skill
+knowledge understanding responsibilities requirements required preferred plus job candidate position
+opportunity company join looking need needs seeking ideal """.split())
+
+SKILL_BOOST = 3.0
+MAX_KEYWORDS = 30
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into word tokens, keeping tech spellings like c++, c#, node.js and ci/cd.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class LocalATSScorer:
+    """
+    Deterministic keyword scorer: TF-IDF weighted coverage of job description keywords by the resume.
+    """
+
+    def __init__(self, vocabulary: Sequence[str] = SKILL_VOCABULARY):
+        self.skills = set(vocabulary)
+        phrases = sorted((skill for skill in vocabulary if " " in skill), key=len, reverse=True)
+        self._phrase_pattern = re.compile(
+            r"(?<![a-z0-9])(" + "|".join(re.escape(phrase) for phrase in phrases) + r")(?![a-z0-9])"
+        ) if phrases else None
+
+    def keywords(self, text: str) -> Counter:
+        """
+        Counts the keywords in `text`: vocabulary phrases plus every non-stopword token.
+        """
+        text = text.lower()
+        counts: Counter = Counter()
+        if self._phrase_pattern is not None:
+            counts.update(self._phrase_pattern.findall(text))
+            text = self._phrase_pattern.sub(" ", text)
+        counts.update(
+            token for token in tokenize(text)
+            if token in self.skills or (token not in STOPWORDS and len(token) > 2 and not token.isdigit())
+        )
+        return counts
+
+    def _job_matrix(self, job_keywords: List[Counter]):
+        """
+        Builds the (jobs x terms) TF-IDF weight matrix; skills get an extra boost.
+        """
+        terms: Dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        for row, counts in enumerate(job_keywords):
+            for term, tf in counts.items():
+                rows.append(row)
+                cols.append(terms.setdefault(term, len(terms)))
+                tfs.append(tf)
+
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        tf = np.asarray(tfs, dtype=np.float64)
+        n_jobs = len(job_keywords)
+        df = np.bincount(cols, minlength=len(terms)).astype(np.float64)
+        idf = np.log((1.0 + n_jobs) / (1.0 + df)) + 1.0
+        boost = np.ones(len(terms))
+        for term, index in terms.items():
+            if term in self.skills:
+                boost[index] = SKILL_BOOST
+        weights = (1.0 + np.log(tf)) * idf[cols] * boost[cols]
+        matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(n_jobs, len(terms)))
+        return matrix, terms
+
+    def rank(self, resume: str, job_descriptions: Iterable[str]) -> np.ndarray:
+        """
+        Scores the resume against many job descriptions at once.
+
+        Returns:
+            np.ndarray: Match scores between 0 and 100, one per job description.
+        """
+        job_keywords = [self.keywords(jd) for jd in job_descriptions]
+        if not job_keywords:
+            return np.zeros(0)
+        matrix, terms = self._job_matrix(job_keywords)
+        resume_terms = self.keywords(resume)
+        present = np.zeros(len(terms))
+        present[[index for term, index in terms.items() if term in resume_terms]] = 1.0
+
+        covered = matrix @ present
+        total = np.asarray(matrix.sum(axis=1)).ravel()
+        return np.round(100.0 * np.divide(covered, total, out=np.zeros_like(covered), where=total > 0))
+
+    def job_profile(self, job_description: str) -> Dict[str, float]:
+        """
+        Weights of the job description's keywords; compute it once to score many resumes against one job.
+        """
+        return {
+            term: (1.0 + math.log(tf)) * (SKILL_BOOST if term in self.skills else 1.0)
+            for term, tf in self.keywords(job_description).items()
+        }
+
+    def score_profile(self, job_profile: Dict[str, float], resume: str) -> Dict[str, Any]:
+        """
+        Scores a resume against a precomputed `job_profile`.
+        """
+        resume_terms = self.keywords(resume)
+        total = sum(job_profile.values())
+        covered = sum(weight for term, weight in job_profile.items() if term in resume_terms)
+        ranked = sorted(job_profile, key=lambda term: (-job_profile[term], term))
+        return {
+            "job_description_match_score": int(np.round(100.0 * covered / total)) if total else 0,
+            "matching_keywords": [term for term in ranked if term in resume_terms][:MAX_KEYWORDS],
+            "missing_keywords": [term for term in ranked if term not in resume_terms][:MAX_KEYWORDS],
+        }
+
+    def score(self, resume: str, job_description: str) -> Dict[str, Any]:
+        """
+        Scores one resume/job description pair and lists matching and missing keywords,
+        most important first.
+        """
+        return self.score_profile(self.job_profile(job_description), resume)
+
+
+local_scorer = LocalATSScorer()
+
+
+def local_ats_analysis(resume_content: str, job_description: str) -> Dict[str, Any]:
+    """
+    Builds a `ResumeResponse`-shaped result without calling the LLM.
+    """
+    result = local_scorer.score(resume_content, job_description)
+    missing = result["missing_keywords"][:10]
+    suggestions = (
+        "Consider working these job description keywords into your resume where they reflect real experience: "
+        + ", ".join(missing) + "."
+    ) if missing else "Your resume already covers the key terms of this job description."
+    return {
+        "company_name": "<not found>",
+        "job_ID": "<null>",
+        **result,
+        "resume_edit_suggestions": suggestions,
+    }
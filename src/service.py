@@ -0,0 +1,57 @@
+import os
+import asyncio
+from pathlib import Path
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from src.jobqueue import JobQueue
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+# Longest a client may block on GET /jobs/{id}?wait=...
+MAX_WAIT_SECONDS = 30.0
+SUPPORTED_SUFFIXES = (".pdf", ".docx")
+
+app = FastAPI(title="Job Application Assistant")
+# Queue calls block on SQLite (up to its busy timeout), so they run in the threadpool, never on the event loop
+queue = JobQueue()
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(resume: UploadFile = File(...), job_description: str = Form(...)):
+    """
+    Queues an analyze request; run `python -m src.worker` to process it.
+    """
+    if Path(resume.filename or "").suffix.lower() not in SUPPORTED_SUFFIXES:
+        raise HTTPException(status_code=415, detail="Unsupported file format. Please upload a PDF or DOCX file.")
+    data = await resume.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Resume is larger than {MAX_UPLOAD_BYTES} bytes.")
+    if not job_description.strip():
+        raise HTTPException(status_code=422, detail="Job description is empty.")
+
+    job_id = await run_in_threadpool(queue.enqueue, job_description, data, resume.filename)
+    return {"id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    """
+    Returns the job status and, once done, its result. With `wait` the request blocks
+    up to that many seconds for the job to finish (long polling). Finished jobs are
+    deleted after JOB_RETENTION_HOURS and then return 404.
+    """
+    deadline = asyncio.get_running_loop().time() + min(max(wait, 0.0), MAX_WAIT_SECONDS)
+    while True:
+        job = await run_in_threadpool(queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        if job["status"] in ("done", "failed") or asyncio.get_running_loop().time() >= deadline:
+            return job
+        await asyncio.sleep(0.25)
+
+
+@app.get("/health")
+async def health():
+    """
+    Queue depth per status, for load balancers and autoscaling.
+    """
+    return {"status": "ok", "jobs": await run_in_threadpool(queue.depth)}
@@ -0,0 +1,257 @@
+import os
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Spans recorded while a graph node runs are collected here (see `collect_spans`)
+_current_spans: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("telemetry_spans", default=None)
+
+# MEMORY_PROFILE=1 adds tracemalloc heap tracing to `memory_profile` reports (slows the profiled code down)
+MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "0") == "1"
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+_metrics: Optional[Dict[str, Any]] = None
+_metrics_lock = threading.Lock()
+_llm_handler_class = None
+
+
+def _get_metrics() -> Dict[str, Any]:
+    """
+    Creates the Prometheus metrics on first use. Returns an empty dict when
+    prometheus_client is not installed, in which case spans are only kept in the run state.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            try:
+                from prometheus_client import Counter, Histogram
+
+                _metrics = {
+                    "span_seconds": Histogram(
+                        "assistant_span_seconds", "Duration of extraction, LLM and HTTP spans.",
+                        ["kind", "name", "status"],
+                    ),
+                    "llm_tokens": Counter(
+                        "assistant_llm_tokens_total", "LLM tokens used.", ["name", "type"],
+                    ),
+                    "llm_time_to_first_token": Histogram(
+                        "assistant_llm_time_to_first_token_seconds", "Time to the first streamed LLM token.", ["name"],
+                    ),
+                    "llm_retries": Counter(
+                        "assistant_llm_retries_total", "LLM call retries.", ["name"],
+                    ),
+                }
+            except ImportError:
+                _metrics = {}
+        return _metrics
+
+
+def start_metrics_server(port: Optional[int] = None) -> bool:
+    """
+    Exposes the Prometheus metrics over HTTP on `port` (default: METRICS_PORT or 9100).
+    """
+    try:
+        from prometheus_client import start_http_server
+    except ImportError:
+        logging.warning("prometheus_client is not installed; metrics are only recorded in the run state.")
+        return False
+    _get_metrics()
+    start_http_server(port or int(os.getenv("METRICS_PORT", 9100)))
+    return True
+
+
+def _export(record: Dict[str, Any]) -> None:
+    metrics = _get_metrics()
+    if not metrics:
+        return
+    metrics["span_seconds"].labels(record["kind"], record["name"], record["status"]).observe(record["seconds"])
+    if record["kind"] == "llm":
+        metrics["llm_tokens"].labels(record["name"], "prompt").inc(record.get("prompt_tokens", 0))
+        metrics["llm_tokens"].labels(record["name"], "completion").inc(record.get("completion_tokens", 0))
+        metrics["llm_retries"].labels(record["name"]).inc(record.get("retries", 0))
+        if record.get("time_to_first_token") is not None:
+            metrics["llm_time_to_first_token"].labels(record["name"]).observe(record["time_to_first_token"])
+
+
+@contextmanager
+def collect_spans():
+    """
+    Collects every span recorded in the current context (including worker threads and
+    tasks started from it) into the yielded list.
+    """
+    spans: List[Dict[str, Any]] = []
+    token = _current_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_spans.reset(token)
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes):
+    """
+    Times a unit of work. `kind` is "extraction", "llm" or "http"; the yielded record can
+    be annotated with extra attributes (tokens, cache hits, status codes).
+    """
+    record: Dict[str, Any] = {"kind": kind, "name": name, **attributes}
+    start = time.perf_counter()
+    record["_start"] = start
+    try:
+        yield record
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record.pop("_start", None)
+        record["seconds"] = round(time.perf_counter() - start, 4)
+        record.setdefault("status", "ok")
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.append(record)
+        try:
+            _export(record)
+        except Exception:
+            logging.exception("Failed to export telemetry span")
+
+
+def llm_callback_handler(record: Dict[str, Any]):
+    """
+    LangChain callback handler that writes token usage, time-to-first-token and retries into `record`.
+    """
+    global _llm_handler_class
+    if _llm_handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class LLMTelemetryHandler(BaseCallbackHandler):
+            def __init__(self, record):
+                self.record = record
+                self.start = record.get("_start", time.perf_counter())
+
+            def on_llm_new_token(self, token, **kwargs):
+                if self.record.get("time_to_first_token") is None:
+                    self.record["time_to_first_token"] = round(time.perf_counter() - self.start, 4)
+
+            def on_retry(self, retry_state, **kwargs):
+                self.record["retries"] = self.record.get("retries", 0) + 1
+
+            def on_llm_end(self, response, **kwargs):
+                usage = (response.llm_output or {}).get("token_usage") or {}
+                prompt_tokens = usage.get("prompt_tokens")
+                completion_tokens = usage.get("completion_tokens")
+                if prompt_tokens is None:
+                    for generations in response.generations:
+                        for generation in generations:
+                            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                            prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                            completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+                self.record["prompt_tokens"] = self.record.get("prompt_tokens", 0) + (prompt_tokens or 0)
+                self.record["completion_tokens"] = self.record.get("completion_tokens", 0) + (completion_tokens or 0)
+
+        _llm_handler_class = LLMTelemetryHandler
+    return _llm_handler_class(record)
+
+
+def summarize(nodes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Builds the per-run summary from the spans of every node.
+    """
+    spans = [record for node in nodes.values() for record in node.get("spans", [])]
+    seconds_by_kind: Dict[str, float] = {}
+    for record in spans:
+        seconds_by_kind[record["kind"]] = round(seconds_by_kind.get(record["kind"], 0.0) + record["seconds"], 4)
+    llm_spans = [record for record in spans if record["kind"] == "llm"]
+    slowest = max(nodes.items(), key=lambda item: item[1].get("seconds", 0.0))[0] if nodes else None
+    return {
+        "node_seconds": {name: node.get("seconds", 0.0) for name, node in nodes.items()},
+        "seconds_by_kind": seconds_by_kind,
+        "slowest_node": slowest,
+        "llm_calls": len(llm_spans),
+        "llm_retries": sum(record.get("retries", 0) for record in llm_spans),
+        "prompt_tokens": sum(record.get("prompt_tokens", 0) for record in llm_spans),
+        "completion_tokens": sum(record.get("completion_tokens", 0) for record in llm_spans),
+        "errors": sum(record["status"] == "error" for record in spans),
+    }
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of the process in MiB (peak RSS where /proc is not available).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        import sys
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def _start_tracing() -> None:
+    # tracemalloc is process-wide, so it runs while any profiled block is active
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    # tracing started outside this module (e.g. PYTHONTRACEMALLOC) is left running
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+@contextmanager
+def memory_profile(trace: bool = MEMORY_PROFILE, top: int = 5):
+    """
+    Measures the process RSS around a block; the yielded report is filled in when the block exits.
+
+    With `trace`, tracemalloc also records the largest allocation sites that grew while the
+    block ran and the peak traced heap. Both are process-wide: blocks running at the same
+    time share one trace, so their numbers include each other's work, and the peak is the
+    highest seen since tracing started. Profiling failures are logged, never raised.
+    """
+    report: Dict[str, Any] = {"rss_before_mb": current_rss_mb()}
+    tracing = False
+    before = None
+    if trace:
+        try:
+            _start_tracing()
+            tracing = True
+            before = tracemalloc.take_snapshot()
+        except Exception:
+            logging.exception("Failed to start memory tracing")
+    try:
+        yield report
+    finally:
+        try:
+            if before is not None:
+                _, peak = tracemalloc.get_traced_memory()
+                report["traced_peak_mb"] = round(peak / 2 ** 20, 2)
+                report["top_allocations"] = [
+                    str(stat) for stat in tracemalloc.take_snapshot().compare_to(before, "lineno")[:top]
+                ]
+            report["rss_after_mb"] = current_rss_mb()
+            report["rss_delta_mb"] = round(report["rss_after_mb"] - report["rss_before_mb"], 1)
+        except Exception:
+            logging.exception("Failed to collect the memory profile")
+        finally:
+            if tracing:
+                _stop_tracing()
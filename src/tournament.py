@@ -0,0 +1,142 @@
+import json
+import heapq
+import asyncio
+import logging
+import argparse
+import itertools
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.cache import make_key
+from src.parsing import parse_documents, iter_document_paths
+from src.scorer import local_scorer
+from src.batch import AdaptiveConcurrency, score_job
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_SHORTLIST = 20
+DEFAULT_LEADERBOARD_SIZE = 25
+
+
+def _entry(path: str, result: Dict[str, Any], scored_by: str) -> Dict[str, Any]:
+    return {
+        "path": path,
+        "job_description_match_score": result.get("job_description_match_score", 0),
+        "matching_keywords": result.get("matching_keywords", []),
+        "missing_keywords": result.get("missing_keywords", []),
+        "scored_by": scored_by,
+    }
+
+
+async def _llm_score(job_description: str, shortlist: List[Tuple[float, int, str, str]],
+                     concurrency: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Scores the shortlisted resumes with the ATS analysis (cached, retried, at batch priority).
+    """
+    slots = AdaptiveConcurrency(concurrency)
+    job = {"id": "job", "job_description": job_description}
+
+    async def score(path: str, text: str):
+        try:
+            resume_bytes = await asyncio.to_thread(Path(path).read_bytes)
+            return path, await score_job(text, make_key(resume_bytes), job, slots)
+        except Exception as e:
+            logging.exception(f"Failed to score {path}")
+            return path, {"error": str(e)}
+
+    results = await asyncio.gather(*(score(path, text) for _, _, path, text in shortlist))
+    return dict(results)
+
+
+def rank_resumes(job_description: str, resume_paths: Iterable[Path], output_path: Path,
+                 shortlist_size: int = DEFAULT_SHORTLIST, leaderboard_size: int = DEFAULT_LEADERBOARD_SIZE,
+                 concurrency: int = 8, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Ranks many resumes against one job description.
+
+    The job description's keywords are computed once. Resumes are parsed in a process pool
+    and pre-scored locally as they arrive; only the best `shortlist_size` go to the LLM.
+    Every result is streamed to `output_path` (JSONL), and only the shortlist texts and the
+    top `leaderboard_size` entries are held in memory, however many resumes there are.
+
+    Returns:
+        dict: Run counts and the leaderboard, best first.
+    """
+    output_path = Path(output_path)
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    profile = local_scorer.job_profile(job_description)
+    counter = itertools.count()
+    shortlist: List[Tuple[float, int, str, str]] = []
+    parsed = failed = 0
+
+    with open(partial_path, "w", encoding="utf-8") as out:
+        for document in parse_documents(resume_paths, max_workers=max_workers):
+            if document["error"]:
+                failed += 1
+                out.write(json.dumps({"path": document["path"], "error": document["error"]}) + "\n")
+                continue
+            parsed += 1
+            result = local_scorer.score_profile(profile, document["text"])
+            out.write(json.dumps(_entry(document["path"], result, "local")) + "\n")
+
+            candidate = (result["job_description_match_score"], next(counter), document["path"], document["text"])
+            if len(shortlist) < shortlist_size:
+                heapq.heappush(shortlist, candidate)
+            elif shortlist_size and candidate[0] > shortlist[0][0]:
+                heapq.heapreplace(shortlist, candidate)
+
+    logging.info(f"Parsed {parsed} resumes ({failed} failed); scoring the best {len(shortlist)} with the LLM.")
+    llm_results = asyncio.run(_llm_score(job_description, shortlist, concurrency)) if shortlist else {}
+    shortlist.clear()
+
+    # Replace the local results of shortlisted resumes and keep the best entries
+    leaderboard: List[Tuple[int, int, Dict[str, Any]]] = []
+    with open(partial_path, encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+        for line in f:
+            entry = json.loads(line)
+            llm_result = llm_results.get(entry["path"])
+            if llm_result is not None:
+                if llm_result.get("error"):
+                    entry["llm_error"] = llm_result["error"]
+                else:
+                    entry = {**_entry(entry["path"], llm_result, "llm"),
+                             "local_score": entry["job_description_match_score"]}
+            out.write(json.dumps(entry) + "\n")
+            if "error" in entry:
+                continue
+            ranked = (entry["job_description_match_score"], -next(counter), entry)
+            if len(leaderboard) < leaderboard_size:
+                heapq.heappush(leaderboard, ranked)
+            elif leaderboard_size and ranked[:2] > leaderboard[0][:2]:
+                heapq.heapreplace(leaderboard, ranked)
+    partial_path.unlink()
+
+    return {
+        "resumes": parsed + failed,
+        "parsed": parsed,
+        "failed": failed,
+        "llm_scored": sum(not result.get("error") for result in llm_results.values()),
+        "leaderboard": [entry for _, _, entry in sorted(leaderboard, key=lambda item: item[:2], reverse=True)],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rank many resumes against one job description.")
+    parser.add_argument("job_description", type=Path, help="Text file with the job description.")
+    parser.add_argument("resumes", type=Path, help="Directory of PDF/DOCX resumes.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("tournament_results.jsonl"))
+    parser.add_argument("--shortlist", type=int, default=DEFAULT_SHORTLIST, help="Resumes re-scored by the LLM.")
+    parser.add_argument("--top", type=int, default=DEFAULT_LEADERBOARD_SIZE, help="Leaderboard size.")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Concurrent LLM calls.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Parser processes.")
+    args = parser.parse_args(argv)
+
+    report = rank_resumes(
+        args.job_description.read_text(encoding="utf-8"), iter_document_paths(args.resumes), args.output,
+        args.shortlist, args.top, args.concurrency, args.workers,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
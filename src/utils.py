@@ -1,24 +1,39 @@
 from pydantic import BaseModel, Field
 from pathlib import Path
-import fitz  # PyMuPDF
-import docx
-import requests  
+import asyncio
+import weakref
+import threading
+from contextvars import ContextVar
 import webbrowser
 import urllib.parse
-from src.model import llm_model
+from src.model import invoke_structured, ainvoke_structured
 from src.prompt import cold_mail_prompt
+from src.compression import compress_prompt_inputs
+from src.cache import SQLiteCache, SingleFlight, make_key
+from src.telemetry import span
+from src.ratelimit import RateLimitExceeded, get_limiter, call_with_retries, acall_with_retries
+import io
 import os
-from typing import Dict, Union
-from dotenv import load_dotenv
+import re
+from typing import Dict, Optional, Union, TYPE_CHECKING
+from src.config import load_env
 from typing import List
 
+if TYPE_CHECKING:
+    import httpx
 
-load_dotenv()  
+# PyMuPDF, python-docx and httpx are imported on first use to keep start-up fast
+
+load_env()
 
 
 # Load API key from environment variable
 HUNTER_API_KEY = os.getenv("HUNTER_API_KEY")
 
+# Set by checkpointed graph nodes: unexpected errors (LLM timeouts, outages) are raised instead of
+# being turned into error messages, so the run stops at its last checkpoint and can be resumed
+raise_unexpected_errors: ContextVar[bool] = ContextVar("raise_unexpected_errors", default=False)
+
 
 class ColdEmailResponse(BaseModel):
     subject: str = Field(
@@ -53,6 +68,16 @@ class ResumeResponse(BaseModel):
         description="Integrate relevant keywords from the job description into my resume, but maintain a natural flow. Do this without keyword stuffing."
     )
 
+class ApplicationResponse(BaseModel):
+    """ATS analysis and cold email produced together by a single LLM call."""
+
+    ats_analysis: ResumeResponse = Field(
+        description="ATS analysis of the resume against the job description."
+    )
+    cold_email: ColdEmailResponse = Field(
+        description="Cold email to the hiring team for this job."
+    )
+
 def generate_cold_email(resume_content: str, job_description: str) -> Dict[str, str]:
     """
     Uses an LLM to generate a cold email based on the provided resume and job description.
@@ -65,87 +90,275 @@ def generate_cold_email(resume_content: str, job_description: str) -> Dict[str,
         dict: A structured response containing the generated cold email.
     """
     try:
-        structure_output = llm_model.with_structured_output(ColdEmailResponse)
-        response = structure_output.invoke(
+        resume_content, job_description = compress_prompt_inputs(resume_content, job_description)
+        response = invoke_structured(
+            ColdEmailResponse,
             cold_mail_prompt.format(resume_content=resume_content, job_description=job_description)
         ).model_dump()
         return response
     except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
         return {"error": f"Failed to generate cold email: {str(e)}"}
 
+async def agenerate_cold_email(resume_content: str, job_description: str) -> Dict[str, str]:
+    """
+    Async version of `generate_cold_email` using the LLM's async API.
+    """
+    try:
+        resume_content, job_description = compress_prompt_inputs(resume_content, job_description)
+        response = (await ainvoke_structured(
+            ColdEmailResponse,
+            cold_mail_prompt.format(resume_content=resume_content, job_description=job_description)
+        )).model_dump()
+        return response
+    except Exception as e:
+        if raise_unexpected_errors.get():
+            raise
+        return {"error": f"Failed to generate cold email: {str(e)}"}
+
+HUNTER_DOMAIN_SEARCH_URL = "https://api.hunter.io/v2/domain-search"
+COMPANY_NOT_FOUND = "Organization details not found!"
+
+# Keep-alive connection pools shared by every Hunter.io lookup.
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_TIMEOUT_SECONDS = 10.0
+
+_http_client: Optional["httpx.Client"] = None
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_http_client_lock = threading.Lock()
+# Custom httpx transport of the pooled clients, see `set_http_transport`
+_http_transport = None
+
+
+def _http_client_options() -> Dict:
+    import httpx
+
+    options = {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=30,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT_SECONDS),
+    }
+    if _http_transport is not None:
+        options["transport"] = _http_transport
+    return options
+
+
+def set_http_transport(transport) -> None:
+    """
+    Routes the pooled HTTP clients through `transport`, e.g. the recorded-response transport
+    of the offline benchmarks. Clients created before the call are replaced.
+    """
+    global _http_client, _http_transport
+    with _http_client_lock:
+        _http_transport = transport
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+        _async_http_clients.clear()
+
+
+def get_http_client() -> "httpx.Client":
+    """
+    Returns the process-wide pooled HTTP client, creating it on first use.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            import httpx
+
+            _http_client = httpx.Client(**_http_client_options())
+        return _http_client
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """
+    Returns the pooled async HTTP client of the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        client = httpx.AsyncClient(**_http_client_options())
+        _async_http_clients[loop] = client
+    return client
+
+
+def _hunter_params(company_name: str) -> Dict[str, str]:
+    if not HUNTER_API_KEY:
+        raise ValueError("Hunter.io API key not found. Please set HUNTER_API_KEY as an environment variable.")
+    return {"company": company_name, "api_key": HUNTER_API_KEY}
+
+
+def _parse_company_response(response: "httpx.Response") -> Dict[str, Union[str, list]]:
+    response.raise_for_status()  # Raises an HTTPStatusError for bad responses (4xx and 5xx)
+
+    result = response.json()
+    if not isinstance(result, dict):
+        return {"error": "Invalid API response format."}
+
+    domain = result.get("data", {}).get("domain")
+    if domain:
+        emails = [email.get("value", "") for email in result["data"].get("emails", []) if "value" in email]
+        return {"emails": emails, "domain": domain}
+    else:
+        return {"error": COMPANY_NOT_FOUND}
+
+
+def _company_lookup_error(error: Exception) -> Dict[str, str]:
+    import httpx
+
+    if isinstance(error, RateLimitExceeded):
+        return {"error": str(error)}
+    if isinstance(error, httpx.TimeoutException):
+        return {"error": "Request timed out. Please try again later."}
+    if isinstance(error, httpx.HTTPStatusError):
+        return {"error": f"HTTP error occurred: {error}"}
+    if isinstance(error, httpx.NetworkError):
+        return {"error": "Network connection error. Please check your internet connection."}
+    if isinstance(error, httpx.RequestError):
+        return {"error": f"Request failed: {error}"}
+    if isinstance(error, KeyError):
+        return {"error": f"Missing expected data in API response: {error}"}
+    return {"error": f"Unexpected error: {str(error)}"}
+
+
+# Company lookups are cached across runs; "not found" answers are kept for a shorter time.
+company_cache = SQLiteCache("company_info", ttl=float(os.getenv("COMPANY_CACHE_TTL", 30 * 24 * 3600)))
+COMPANY_NEGATIVE_CACHE_TTL = float(os.getenv("COMPANY_NEGATIVE_CACHE_TTL", 24 * 3600))
+_company_lookups = SingleFlight()
+
+_LEGAL_SUFFIXES = {"inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "plc", "gmbh", "pvt", "ag", "sa"}
+
+
+def normalize_company_name(company_name: str) -> str:
+    """
+    Normalizes a company name for cache lookups: lowercase, no punctuation and
+    no trailing legal suffixes ("IBM Corp." and "ibm" share an entry).
+    """
+    words = re.sub(r"[^\w\s&]", " ", company_name.lower()).split()
+    while len(words) > 1 and words[-1] in _LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _cache_company_info(key: str, result: Dict[str, Union[str, list]]) -> None:
+    if result.get("domain"):
+        company_cache.set(key, result)
+    elif result.get("error") == COMPANY_NOT_FOUND:
+        company_cache.set(key, result, ttl=COMPANY_NEGATIVE_CACHE_TTL)
+
+
+def company_lookup_stats() -> Dict[str, Union[int, float]]:
+    """
+    Cache hit/miss counters for company lookups, plus how many concurrent lookups were
+    coalesced into an in-flight upstream call.
+    """
+    return {**company_cache.stats(), "coalesced": _company_lookups.shared}
+
+
 def get_company_info(company_name: str) -> Dict[str, Union[str, list]]:
     """
     Fetches company email addresses and domain information from the Hunter.io API.
 
+    Results are served from the local company cache when possible, and concurrent
+    lookups for the same company share a single upstream call.
+
     Args:
         company_name (str): The name of the company to search for.
 
     Returns:
         dict: A dictionary containing email addresses and the domain if found, or an error message.
     """
-    if not HUNTER_API_KEY:
-        raise ValueError("Hunter.io API key not found. Please set HUNTER_API_KEY as an environment variable.")
+    key = normalize_company_name(company_name)
+    cached = company_cache.get(key)
+    if cached is not None:
+        return cached
 
-    url = f"https://api.hunter.io/v2/domain-search?company={company_name}&api_key={HUNTER_API_KEY}"
-    
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx and 5xx)
-        
-        result = response.json()
-        if not isinstance(result, dict):
-            return {"error": "Invalid API response format."}
-        
-        domain = result.get("data", {}).get("domain")
-        if domain:
-            emails = [email.get("value", "") for email in result["data"].get("emails", []) if "value" in email]
-            return {"emails": emails, "domain": domain}
-        else:
-            return {"error": "Organization details not found!"}
-    
-    except requests.exceptions.Timeout:
-        return {"error": "Request timed out. Please try again later."}
-    except requests.exceptions.HTTPError as http_err:
-        return {"error": f"HTTP error occurred: {http_err}"}
-    except requests.exceptions.ConnectionError:
-        return {"error": "Network connection error. Please check your internet connection."}
-    except requests.exceptions.RequestException as req_err:
-        return {"error": f"Request failed: {req_err}"}
-    except KeyError as key_err:
-        return {"error": f"Missing expected data in API response: {key_err}"}
-    except Exception as e:
-        return {"error": f"Unexpected error: {str(e)}"}
+    params = _hunter_params(company_name)
 
-import smtplib
-import urllib.parse
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+    limiter = get_limiter("hunter")
+
+    def request():
+        response = get_http_client().get(HUNTER_DOMAIN_SEARCH_URL, params=params)
+        limiter.update_from_headers(response.headers)
+        response.raise_for_status()
+        return response
 
-def send_email_smtp(sender_email, sender_password, email_list, subject, body):
+    def fetch():
+        with span("http", "hunter.domain_search") as record:
+            try:
+                response = call_with_retries(request, limiter)
+                record["status_code"] = response.status_code
+                result = _parse_company_response(response)
+            except Exception as e:
+                record["status"] = "error"
+                return _company_lookup_error(e)
+        _cache_company_info(key, result)
+        return result
+
+    # a lookup that finished after our cache check has stored its result by now
+    return _company_lookups.do(key, fetch, recheck=lambda: company_cache.get(key, count=False))
+
+
+async def aget_company_info(company_name: str) -> Dict[str, Union[str, list]]:
     """
-    Sends cold emails using SMTP.
+    Async version of `get_company_info` backed by the pooled async HTTP client.
     """
-    smtp_server = "smtp.gmail.com"  # Change if using Outlook, Yahoo, etc.
-    smtp_port = 587
+    key = normalize_company_name(company_name)
+    cached = await asyncio.to_thread(company_cache.get, key)
+    if cached is not None:
+        return cached
 
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Secure connection
-        server.login(sender_email, sender_password)
+    params = _hunter_params(company_name)
+
+    limiter = get_limiter("hunter")
+
+    async def request():
+        response = await get_async_http_client().get(HUNTER_DOMAIN_SEARCH_URL, params=params)
+        await limiter.aupdate_from_headers(response.headers)
+        response.raise_for_status()
+        return response
 
-        for recipient in email_list:
-            msg = MIMEMultipart()
-            msg["From"] = sender_email
-            msg["To"] = recipient
-            msg["Subject"] = subject
-            msg.attach(MIMEText(body, "plain"))
+    async def fetch():
+        with span("http", "hunter.domain_search") as record:
+            try:
+                response = await acall_with_retries(request, limiter)
+                record["status_code"] = response.status_code
+                result = _parse_company_response(response)
+            except Exception as e:
+                record["status"] = "error"
+                return _company_lookup_error(e)
+        await asyncio.to_thread(_cache_company_info, key, result)
+        return result
 
-            server.sendmail(sender_email, recipient, msg.as_string())
+    return await _company_lookups.ado(key, fetch, recheck=lambda: asyncio.to_thread(company_cache.get, key, False))
+
+def send_email_smtp(sender_email, sender_password, email_list, subject, body, attachment=None):
+    """
+    Sends cold emails using SMTP (server settings from the SMTP_* environment variables).
+
+    Args:
+        attachment (tuple, optional): (filename, bytes) of a file to attach, e.g. the resume.
+
+    Returns:
+        str: A summary of the sends; use `src.mailer.send_bulk_email` for the per-recipient report.
+    """
+    from src.mailer import send_bulk_email
 
-        server.quit()
-        return "Emails sent successfully!"
+    try:
+        report = send_bulk_email(sender_email, sender_password, email_list, subject, body, attachment)
     except Exception as e:
         return f"Error sending emails: {str(e)}"
+    if report["failed"]:
+        errors = "; ".join(f"{r['recipient']}: {r['error']}" for r in report["results"] if r["status"] == "failed")
+        return f"Error sending emails: {report['failed']} of {report['failed'] + report['sent']} failed ({errors})"
+    return "Emails sent successfully!"
 
 import urllib.parse
 
@@ -164,15 +377,75 @@ def launch_email_client(template, email_list, subject):
     return f'<a href="{mailto_link}" target="_blank"><button style="padding:10px 20px; background-color:#4CAF50; color:white; border:none; border-radius:5px; cursor:pointer;">Open Email Client</button></a>'
 
 
-def extract_from_doc(file_path: Path) -> str:
-    if file_path.suffix.lower() == ".pdf":
-        doc = fitz.open(file_path)
-        text = "\n".join([page.get_text("text") for page in doc])
-        return text
-    
-    if file_path.suffix.lower() == ".docx":
-        doc = docx.Document(file_path)
+# Parsed resumes keyed by content hash, so re-uploads and resumes reused across
+# many job descriptions are only parsed once.
+parsed_resume_store = SQLiteCache(
+    "parsed_resume",
+    ttl=float(os.getenv("PARSED_RESUME_TTL", 30 * 24 * 3600)),
+    max_entries=int(os.getenv("PARSED_RESUME_MAX_ENTRIES", 5000)),
+)
+
+
+def parse_document(data: bytes, suffix: str) -> Dict[str, Union[str, List[str]]]:
+    """
+    Parses an in-memory PDF or DOCX document.
+
+    Args:
+        data (bytes): Raw file contents.
+        suffix (str): File extension, ".pdf" or ".docx".
+
+    Returns:
+        dict: The full text under "text" and, for PDFs, the text of each page under "pages".
+    """
+    suffix = suffix.lower()
+    if suffix == ".pdf":
+        import fitz  # PyMuPDF
+
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            pages = [page.get_text("text") for page in doc]
+        return {"text": "\n".join(pages), "pages": pages}
+
+    if suffix == ".docx":
+        import docx
+
+        doc = docx.Document(io.BytesIO(data))
         text = "\n".join([para.text for para in doc.paragraphs])
-        return text
+        return {"text": text, "pages": []}
 
     raise ValueError("Unsupported file format. Only PDF and DOCX are supported.")
+
+
+def get_parsed_document(data: bytes, suffix: str) -> Dict[str, Union[str, List[str]]]:
+    """
+    Returns the parsed document from the store, parsing and storing it on a miss.
+    """
+    with span("extraction", "parse_document", bytes=len(data)) as record:
+        key = make_key(data)
+        parsed = parsed_resume_store.get(key)
+        record["cached"] = parsed is not None
+        if parsed is None:
+            parsed = parse_document(data, suffix)
+            parsed_resume_store.set(key, parsed)
+        record["pages"] = len(parsed.get("pages", []))
+        return parsed
+
+
+def load_parsed_text(key: str) -> Optional[str]:
+    """
+    Returns the stored text of a document by its content key (`make_key` of its bytes), or None
+    when it was never parsed or has been evicted.
+    """
+    parsed = parsed_resume_store.get(key)
+    return parsed["text"] if parsed is not None else None
+
+
+def extract_from_bytes(data: bytes, suffix: str) -> str:
+    """
+    Extracts the text of an in-memory PDF or DOCX document, using the parsed-document store.
+    """
+    return get_parsed_document(data, suffix)["text"]
+
+
+def extract_from_doc(file_path: Path) -> str:
+    file_path = Path(file_path)
+    return extract_from_bytes(file_path.read_bytes(), file_path.suffix)
@@ -0,0 +1,99 @@
+import os
+import time
+import socket
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.jobqueue import JobQueue
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 0.5))
+# A job running longer than this is assumed to belong to a dead worker and is queued again
+STALE_JOB_SECONDS = float(os.getenv("WORKER_STALE_JOB_SECONDS", 600))
+# How often each worker deletes finished jobs past the queue's retention window
+PRUNE_INTERVAL_SECONDS = 600
+
+def run_job(graph, job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs the workflow for one queued job and returns the stored result: only the agent
+    outputs, since the upload and extracted text are not needed once the job is done.
+    """
+    from src.workflow import compact_result
+
+    state = {
+        "job_description": job["job_description"],
+        "resume_bytes": job["resume_bytes"],
+        "resume_name": job["resume_name"],
+    }
+    return compact_result(graph.invoke(state))
+
+
+def run_worker(queue_path: Optional[Path] = None, poll_interval: float = POLL_INTERVAL,
+               max_jobs: Optional[int] = None) -> int:
+    """
+    Claims and runs jobs until stopped (or until `max_jobs` jobs have run). Returns the number of jobs run.
+    """
+    from src.workflow import get_graph
+
+    queue = JobQueue(queue_path)
+    graph = get_graph()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    logging.info(f"Worker {worker_id} polling {queue.path}")
+
+    last_prune = 0.0
+    while max_jobs is None or processed < max_jobs:
+        # pruned on a timer rather than when idle, so a queue that never drains is pruned too
+        if time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+            last_prune = time.monotonic()
+            pruned = queue.prune_finished()
+            if pruned:
+                logging.info(f"Deleted {pruned} finished jobs past the retention window.")
+        job = queue.claim(worker_id)
+        if job is None:
+            queue.requeue_stale(STALE_JOB_SECONDS)
+            time.sleep(poll_interval)
+            continue
+
+        start = time.perf_counter()
+        try:
+            queue.complete(job["id"], run_job(graph, job))
+            logging.info(f"Job {job['id']} done in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logging.exception(f"Job {job['id']} failed")
+            queue.fail(job["id"], str(e))
+        processed += 1
+    return processed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run workers that process queued analyze requests.")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument("--queue", type=Path, default=None, help="Queue file (default: QUEUE_PATH).")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    if args.workers <= 1:
+        run_worker(args.queue, args.poll_interval)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.queue, args.poll_interval), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
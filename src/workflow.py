@@ -1,16 +1,104 @@
+import os
+import time
+import uuid
+import logging
+from functools import wraps
 from typing_extensions import Annotated, TypedDict, NotRequired, Optional
 from pathlib import Path
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END, START
-from src.agents import ats_analysis_agent, cold_mail_writer_agent, email_finder_agent
+from typing import Dict, Any, Tuple
+import threading
+
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer that merges partial dict updates coming from parallel nodes.
+    """
+    return {**(left or {}), **(right or {})}
+
+
+def join_errors(left: Optional[str], right: Optional[str]) -> Optional[str]:
+    """
+    Reducer that keeps every error message when more than one node fails in the same step.
+    """
+    if left and right and right not in left:
+        return f"{left}; {right}"
+    return left or right
+
+
+def merge_telemetry(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer that merges per-node spans and refreshes the run summary.
+    """
+    from src.telemetry import summarize
+
+    nodes = {**(left or {}).get("nodes", {}), **(right or {}).get("nodes", {})}
+    return {"nodes": nodes, "summary": summarize(nodes)}
+
 
 class AgentState(TypedDict):
     job_description: str
     resume_file: Path
+    resume_bytes: Optional[bytes]
+    resume_name: Optional[str]
+    resume_key: Optional[str]
     resume_content: Optional[str]
     ats_analysis_agent: Optional[Dict[str, Any]]
     email_finder_agent: Optional[Dict[str, Any]]
     cold_mail_writer_agent: Optional[Dict[str, Any]]
+    error: Annotated[Optional[str], join_errors]
+    node_timings: Annotated[Dict[str, float], merge_dicts]
+    telemetry: Annotated[Dict[str, Any], merge_telemetry]
+
+
+def timed_node(name, agent, async_agent=None, raise_errors=False):
+    """
+    Wraps an agent so the wall-clock time of each run is recorded under `node_timings`,
+    and the extraction/LLM/HTTP spans it records are added to `telemetry`.
+
+    When `async_agent` is given the node also supports `graph.ainvoke`/`graph.astream`.
+    With `raise_errors`, unexpected agent errors propagate instead of becoming an `error`
+    message, so a checkpointed run stops at its last checkpoint (see `run_workflow`).
+    """
+    from src.telemetry import collect_spans
+    from src.utils import raise_unexpected_errors
+
+    def finish(update, spans, start):
+        elapsed = round(time.perf_counter() - start, 4)
+        logging.info(f"Node '{name}' finished in {elapsed:.3f}s")
+        return {
+            **update,
+            "node_timings": {name: elapsed},
+            "telemetry": {"nodes": {name: {"seconds": elapsed, "spans": spans}}},
+        }
+
+    @wraps(agent)
+    def wrapper(state):
+        start = time.perf_counter()
+        token = raise_unexpected_errors.set(raise_errors)
+        try:
+            with collect_spans() as spans:
+                update = agent(state) or {}
+        finally:
+            raise_unexpected_errors.reset(token)
+        return finish(update, spans, start)
+
+    if async_agent is None:
+        return wrapper
+
+    @wraps(async_agent)
+    async def async_wrapper(state):
+        start = time.perf_counter()
+        token = raise_unexpected_errors.set(raise_errors)
+        try:
+            with collect_spans() as spans:
+                update = await async_agent(state) or {}
+        finally:
+            raise_unexpected_errors.reset(token)
+        return finish(update, spans, start)
+
+    from langchain_core.runnables import RunnableLambda
+
+    return RunnableLambda(wrapper, afunc=async_wrapper, name=name)
 
 # demo example
 # state = AgentState(
@@ -18,19 +106,249 @@ class AgentState(TypedDict):
 #     resume_file=Path("Aditya_Varpe_AI_Engineer_Resume (5).pdf")
 # )
 
-workflow = StateGraph(AgentState)
+# FUSED_MODE=1 produces the ATS analysis and the cold email with one LLM call
+FUSED_MODE = os.getenv("FUSED_MODE", "0") == "1"
+
+
+def build_graph(fused: bool = FUSED_MODE, checkpointer=None):
+    """
+    Builds and compiles the workflow.
+
+    In the default mode the cold mail writer and the email finder fan out in parallel after
+    the ATS analysis. In fused mode a single node writes both the analysis and the cold email,
+    and only the email finder runs after it. With a `checkpointer` the state is saved after
+    every step and unexpected node errors stop the run so it can be resumed.
+    """
+    # LangGraph and the agents (LLM clients, parsers, HTTP clients) load only when a graph is built
+    from langgraph.graph import StateGraph, END, START
+    from src.agents import (
+        ats_analysis_agent, cold_mail_writer_agent, email_finder_agent,
+        aats_analysis_agent, acold_mail_writer_agent, aemail_finder_agent,
+        fused_analysis_agent, afused_analysis_agent,
+    )
+
+    workflow = StateGraph(AgentState)
+    resumable = checkpointer is not None
+
+    if fused:
+        workflow.add_node("fused_analysis", timed_node("fused_analysis", fused_analysis_agent, afused_analysis_agent, resumable))
+        workflow.add_node("email_finder", timed_node("email_finder", email_finder_agent, aemail_finder_agent, resumable))
+
+        workflow.add_edge(START, "fused_analysis")
+        workflow.add_edge("fused_analysis", "email_finder")
+        workflow.add_edge("email_finder", END)
+        return workflow.compile(checkpointer=checkpointer)
+
+    # add nodes first; each has a sync and an async implementation so both
+    # graph.invoke and graph.ainvoke work on the same compiled graph
+    workflow.add_node("ats_analysis", timed_node("ats_analysis", ats_analysis_agent, aats_analysis_agent, resumable))
+    workflow.add_node("cold_mail_writer", timed_node("cold_mail_writer", cold_mail_writer_agent, acold_mail_writer_agent, resumable))
+    workflow.add_node("email_finder", timed_node("email_finder", email_finder_agent, aemail_finder_agent, resumable))
+
+    # Connect agents with edges: once the ATS analysis is done, the cold mail writer
+    # and the email finder only depend on its output, so they fan out and run in parallel.
+    workflow.add_edge(START, "ats_analysis")
+    workflow.add_edge("ats_analysis", "cold_mail_writer")
+    workflow.add_edge("ats_analysis", "email_finder")
+    workflow.add_edge("cold_mail_writer", END)
+    workflow.add_edge("email_finder", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+# What is worth keeping of a finished run; the upload, resume text and job description are dropped
+AGENT_OUTPUT_KEYS = ("ats_analysis_agent", "email_finder_agent", "cold_mail_writer_agent")
+RESULT_KEYS = AGENT_OUTPUT_KEYS + ("error", "node_timings")
+
+
+def compact_result(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The agent outputs, errors and timings of a run state plus its telemetry summary.
+    """
+    result = {key: values.get(key) for key in RESULT_KEYS if values.get(key) is not None}
+    summary = (values.get("telemetry") or {}).get("summary")
+    if summary:
+        result["telemetry"] = summary
+    return result
+
+
+# Checkpoints of resumable runs, keyed by thread ID
+CHECKPOINT_PATH = Path(os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite"))
+# Checkpoints hold the job description and the agent outputs, so a thread is deleted this long after its last run
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_HOURS", 24)) * 3600
+PRUNE_INTERVAL_SECONDS = 600
+
+_graphs: Dict[Tuple[bool, bool], Any] = {}
+_graphs_lock = threading.Lock()
+_checkpointer = None
+_activity_lock = threading.Lock()
+_activity_conn = None
+_last_prune = 0.0
+
+
+def get_checkpointer():
+    """
+    Returns the SQLite checkpointer shared by the checkpointed graphs, creating it on first use.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _checkpointer = SqliteSaver(sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False))
+    return _checkpointer
+
+
+def _get_activity_conn():
+    # When each thread was last run, kept next to the checkpoints. Caller holds `_activity_lock`.
+    global _activity_conn
+    if _activity_conn is None:
+        import sqlite3
+
+        CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _activity_conn = sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False, timeout=30)
+        _activity_conn.execute("CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_used REAL)")
+        _activity_conn.commit()
+    return _activity_conn
+
+
+def prune_checkpoints(max_age: float = CHECKPOINT_TTL_SECONDS) -> int:
+    """
+    Deletes the checkpoints of every thread not run in the last `max_age` seconds.
+    Returns the number of threads deleted.
+    """
+    checkpointer = get_checkpointer()
+    checkpointer.setup()
+    cutoff = time.time() - max_age
+    with _activity_lock:
+        conn = _get_activity_conn()
+        # threads without a recorded run predate the activity table and are treated as expired
+        expired = [row[0] for row in conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id NOT IN "
+            "(SELECT thread_id FROM thread_activity WHERE last_used >= ?)", (cutoff,)
+        )]
+        conn.execute("DELETE FROM thread_activity WHERE last_used < ?", (cutoff,))
+        conn.commit()
+    for thread_id in expired:
+        checkpointer.delete_thread(thread_id)
+    if expired:
+        logging.info(f"Deleted the checkpoints of {len(expired)} expired runs.")
+    return len(expired)
+
+
+def _record_run(thread_id: str) -> None:
+    # Marks the thread as just run and prunes expired threads every PRUNE_INTERVAL_SECONDS
+    global _last_prune
+    now = time.time()
+    with _activity_lock:
+        conn = _get_activity_conn()
+        conn.execute("INSERT OR REPLACE INTO thread_activity (thread_id, last_used) VALUES (?, ?)", (thread_id, now))
+        conn.commit()
+        due = now - _last_prune >= PRUNE_INTERVAL_SECONDS
+        if due:
+            _last_prune = now
+    if due:
+        try:
+            prune_checkpoints()
+        except Exception:
+            logging.exception("Failed to prune expired checkpoints")
+
+
+def delete_run(thread_id: str) -> None:
+    """
+    Deletes the checkpoints of a run, e.g. once its session has moved on to another application.
+    """
+    get_checkpointer().delete_thread(thread_id)
+    with _activity_lock:
+        conn = _get_activity_conn()
+        conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+        conn.commit()
+
+
+def get_graph(fused: bool = FUSED_MODE, checkpointed: bool = False):
+    """
+    Returns the compiled graph, building it on first use.
+    """
+    with _graphs_lock:
+        key = (fused, checkpointed)
+        if key not in _graphs:
+            _graphs[key] = build_graph(fused, get_checkpointer() if checkpointed else None)
+        return _graphs[key]
+
+
+def run_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def resume_point(graph, state: Dict[str, Any], thread_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Input for a run of a checkpointed graph on `thread_id`: None, i.e. continue from the last
+    checkpoint, when the previous run on the thread failed or was cancelled part-way; `state` otherwise.
+
+    A new run's uploaded bytes are parsed into the parsed-document store first and replaced by
+    their content key, so checkpoints never hold the upload or the resume text; nodes resolve the
+    key through the store when they need the text.
+
+    Also marks the thread as in use, so its checkpoints are kept for another CHECKPOINT_TTL_SECONDS.
+    """
+    from src.agents import load_resume
+    from src.utils import get_parsed_document
+    from src.cache import make_key
+
+    _record_run(thread_id)
+    if graph.get_state(run_config(thread_id)).next:
+        return None
+    if state.get("resume_key") or not (state.get("resume_bytes") or state.get("resume_file")):
+        return state
+    resume_bytes, suffix = load_resume(state)
+    get_parsed_document(resume_bytes, suffix)
+    state = {key: value for key, value in state.items() if key not in ("resume_bytes", "resume_file", "resume_content")}
+    return {**state, "resume_key": make_key(resume_bytes)}
+
+
+def run_workflow(state: Dict[str, Any], thread_id: Optional[str] = None, fused: bool = FUSED_MODE) -> Tuple[str, Dict[str, Any]]:
+    """
+    Runs the workflow with checkpoints under `thread_id` (a new one if not given).
+
+    If a node fails unexpectedly the error is raised; calling again with the same thread ID
+    resumes after the last node that succeeded, so finished nodes (text extraction, the ATS
+    analysis) are not paid for twice.
+
+    Returns:
+        tuple: The thread ID and the final state.
+    """
+    graph = get_graph(fused, checkpointed=True)
+    thread_id = thread_id or uuid.uuid4().hex
+    return thread_id, graph.invoke(resume_point(graph, state, thread_id), run_config(thread_id))
+
+
+def regenerate_cold_email(thread_id: str, fused: bool = FUSED_MODE) -> Dict[str, Any]:
+    """
+    Re-runs only the cold mail writer for a checkpointed run, reusing its resume (through
+    its content key) and job description, and records the new email in the thread. A failed attempt
+    returns its `error` without touching the thread.
+    """
+    from src.agents import cold_mail_writer_agent
 
-# add nodes first
-workflow.add_node("ats_analysis", ats_analysis_agent)
-workflow.add_node("cold_mail_writer", cold_mail_writer_agent)
-workflow.add_node("email_finder", email_finder_agent)
+    graph = get_graph(fused, checkpointed=True)
+    config = run_config(thread_id)
+    _record_run(thread_id)
+    values = graph.get_state(config).values
+    if not values.get("resume_key") or not values.get("ats_analysis_agent"):
+        raise ValueError("No finished analysis found for this run.")
 
-# Connect agents with edges
-workflow.add_edge(START, "ats_analysis")
-workflow.add_edge("ats_analysis", "cold_mail_writer")
-workflow.add_edge("cold_mail_writer", "email_finder")
-workflow.add_edge("email_finder", END)
+    update = cold_mail_writer_agent(values)
+    if update.get("error"):
+        # the thread keeps its previous email; a failed attempt is only reported
+        return update
+    # written as the last node of the graph, so the thread stays finished
+    graph.update_state(config, update, as_node="email_finder" if fused else "cold_mail_writer")
+    return update
 
 
-# Compile the graph
-graph = workflow.compile()
\ No newline at end of file
+def __getattr__(name: str):
+    # `graph` used to be compiled at import time; keep it importable but build it lazily
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")